@@ -1,18 +1,136 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
-from typing import Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
 
+from sqlalchemy import Insert, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .metrics import instrument_engine
+from .query_guard import QueryGuard
+from .settings import Settings, get_settings
+
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _engine_options(settings: Settings) -> dict:
+    # Pool sizes are per process: with N uvicorn workers the database sees up
+    # to N * (pool_size + max_overflow) connections.
+    if _is_sqlite_memory(settings.database_url):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_pre_ping": not settings.database_url.startswith("sqlite"),
+    }
+
+
+def sqlite_pragmas(settings: Settings) -> list[str]:
+    """Pragmas applied to every new SQLite connection.
+
+    WAL lets readers run alongside the single writer, and ``busy_timeout``
+    makes a second writer wait for the lock instead of failing with
+    "database is locked".
+    """
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA cache_size={-settings.sqlite_cache_size_kib}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size_bytes}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def _configure_sqlite(engine: Engine, settings: Settings) -> None:
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
 
-from .settings import get_settings
 
 _settings = get_settings()
-_engine = create_engine(_settings.database_url, echo=False, connect_args={"check_same_thread": False} if "sqlite" in _settings.database_url else {})
+_engine = create_engine(
+    _settings.database_url,
+    echo=False,
+    connect_args={"check_same_thread": False} if "sqlite" in _settings.database_url else {},
+    **_engine_options(_settings),
+)
+_async_engine = create_async_engine(_async_url(_settings.database_url), echo=False, **_engine_options(_settings))
+if _engine.dialect.name == "sqlite":
+    _configure_sqlite(_engine, _settings)
+    _configure_sqlite(_async_engine.sync_engine, _settings)
+_query_guard = QueryGuard(_settings.query_debug_mode, _settings.query_repeat_threshold)
+for _instrumented in (_engine, _async_engine.sync_engine):
+    # The guard reads the counts instrument_engine keeps, so it listens second.
+    instrument_engine(_instrumented)
+    _query_guard.install(_instrumented)
 
 
 def init_db() -> None:
     SQLModel.metadata.create_all(_engine)
+    # create_all skips tables that already exist, so nullable columns and
+    # indexes added to a model later are created here for databases from
+    # earlier releases.
+    _add_missing_columns()
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(_engine, checkfirst=True)
+
+
+def _add_missing_columns() -> None:
+    inspector = inspect(_engine)
+    preparer = _engine.dialect.identifier_preparer
+    with _engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=_engine.dialect)
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {preparer.format_column(column)} {column_type}"
+                    )
+                )
+
+
+def dialect_insert(model) -> Insert:
+    """INSERT construct of the active dialect, exposing ``on_conflict_do_nothing``/``on_conflict_do_update``.
+
+    Every caller upserts, so dialects without that API fail here, naming the
+    dialect, instead of with an ``AttributeError`` at the first write.
+    """
+    if _engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        return sqlite_insert(model)
+    if _engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        return pg_insert(model)
+    raise RuntimeError(
+        f"unsupported database dialect {_engine.dialect.name!r} (DATABASE_URL): upserts need sqlite or postgresql"
+    )
 
 
 def get_session() -> Iterator[Session]:
@@ -38,4 +156,44 @@ def session_scope() -> Iterator[Session]:
         session.close()
 
 
-__all__ = ["init_db", "get_session", "session_scope", "_engine"]
+@asynccontextmanager
+async def async_session_scope() -> AsyncIterator[AsyncSession]:
+    # Same contract as session_scope for request handlers running on the event loop.
+    session = AsyncSession(_async_engine, expire_on_commit=False)
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+@asynccontextmanager
+async def async_read_scope() -> AsyncIterator[AsyncSession]:
+    # Pure reads: no flush and no commit, the transaction is simply released.
+    session = AsyncSession(_async_engine, expire_on_commit=False, autoflush=False)
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+async def dispose_engines() -> None:
+    await _async_engine.dispose()
+    _engine.dispose()
+
+
+__all__ = [
+    "init_db",
+    "dialect_insert",
+    "get_session",
+    "session_scope",
+    "async_session_scope",
+    "async_read_scope",
+    "sqlite_pragmas",
+    "dispose_engines",
+    "_engine",
+    "_async_engine",
+]
@@ -1,15 +1,23 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import json
+from typing import Awaitable, Callable, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, Query, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import APIKeyHeader
-from sqlmodel import select
 
 from .bootstrap import bootstrap_sample_data
-from .db import init_db, session_scope
+from .db import dispose_engines, init_db
+from .metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, outside_budget, render_metrics
+from .query_guard import query_budget
 from .models import User
+from .providers.http import close_async_client
+from .providers.llm_cache import get_response_cache
+from .providers.registry import get_registry
 from .schemas import (
     BlogCreateRequest,
     BlogPayload,
@@ -24,12 +32,15 @@ from .schemas import (
     ExternalReferencesRequest,
     ExternalReferencesResponse,
     GoogleCallbackRequest,
+    JobCreateRequest,
+    JobPayload,
     KeywordDraftRequest,
     KeywordVolumeRequest,
     KeywordVolumeResponse,
     MyBlogReferencesResponse,
     OutlineRequest,
     OutlineResponse,
+    RankRefreshResponse,
     SessionPayload,
     StatusResponse,
 )
@@ -37,8 +48,21 @@ from .services.auth import AuthService
 from .services.blogs import BlogService
 from .services.compose import ComposeService
 from .services.curve import CurveService
+from .services.jobs import get_job_queue, job_payload
 from .services.keywords import KeywordService
 from .services.outline import OutlineService
+from .services.rank_series import RankSeries
+from .services.ranks import RankService
+from .services.versions import (
+    CURVE,
+    MY_BLOG,
+    blogs_key,
+    collaborators_key,
+    get_data_versions,
+    get_versioned_response_cache,
+)
+from .services.volume_cache import get_volume_cache
+from .settings import get_settings
 from .services.references import ReferenceService
 
 app = FastAPI(title="Plog API", version="0.1.0")
@@ -46,10 +70,34 @@ app = FastAPI(title="Plog API", version="0.1.0")
 api_key_scheme = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
+_background_tasks: set[asyncio.Task] = set()
+
+
 @app.on_event("startup")
-def on_startup() -> None:
+async def on_startup() -> None:
     init_db()
-    bootstrap_sample_data()
+    await bootstrap_sample_data()
+    rank_series = RankSeries()
+    await rank_series.backfill()
+    settings = get_settings()
+    registry = get_registry()
+    _background_tasks.add(asyncio.create_task(registry.watch(settings.registry_poll_seconds)))
+    _background_tasks.add(
+        asyncio.create_task(ReferenceService().prune_periodically(settings.reference_prune_interval_seconds))
+    )
+    _background_tasks.add(asyncio.create_task(rank_series.compact_periodically(settings.rank_compact_interval_seconds)))
+    jobs = get_job_queue()
+    await jobs.requeue_interrupted()
+    _background_tasks.update(jobs.start())
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+    await close_async_client()
+    await dispose_engines()
 
 
 app.add_middleware(
@@ -58,50 +106,144 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "ETag"],
 )
+app.add_middleware(MetricsMiddleware, server_timing=get_settings().server_timing_enabled)
 
 
-def get_current_user(api_key: Optional[str] = Depends(api_key_scheme)) -> User:
-    with session_scope() as session:
-        user = session.exec(select(User).order_by(User.id.asc())).first()
+async def get_current_user(api_key: Optional[str] = Depends(api_key_scheme)) -> User:
+    # Authentication is shared by every route, so its lookups are not charged to route query budgets.
+    with outside_budget():
+        return await _authenticate(api_key)
+
+
+async def _authenticate(api_key: Optional[str]) -> User:
+    service = AuthService()
+    if api_key:
+        user = await service.authenticate(api_key)
         if not user:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="사용자를 찾을 수 없습니다")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="유효하지 않은 API 키입니다")
         return user
+    # Requests without a key keep working against the first user in local development only.
+    if get_settings().environment != "dev":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="API 키가 필요합니다")
+    user = await service.dev_user()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="사용자를 찾을 수 없습니다")
+    return user
+
+
+def use_response_cache(cache_control: Optional[str] = Header(default=None)) -> bool:
+    # "Cache-Control: no-cache" regenerates the LLM response and refreshes the cached copy.
+    return "no-cache" not in (cache_control or "").lower()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+async def versioned_json(
+    request: Request,
+    keys: tuple[str, ...],
+    variant: tuple,
+    build: Callable[[], Awaitable[tuple[object, dict[str, str]]]],
+) -> Response:
+    """Answer a polled read from its data version before any ORM work.
+
+    A current ``If-None-Match`` gets a 304, a body already rendered for the
+    same ETag comes from the shared cache, and only otherwise ``build`` runs
+    and returns the payload with its extra headers. A body whose version
+    moved while it was built (a refit bumps the curve) cannot be pinned to
+    either version, so it is sent untagged and not cached.
+    """
+    versions = get_data_versions()
+    etag = await versions.etag(keys, *variant)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    cache = get_versioned_response_cache()
+    entry = cache.get(etag)
+    if entry is None:
+        payload, extra_headers = await build()
+        entry = (JSONResponse(jsonable_encoder(payload)).body, extra_headers)
+        if await versions.etag(keys, *variant) != etag:
+            untagged = {**extra_headers, "Cache-Control": "no-cache"}
+            return Response(content=entry[0], media_type="application/json", headers=untagged)
+        cache.put(etag, *entry)
+    body, extra_headers = entry
+    return Response(content=body, media_type="application/json", headers={**extra_headers, **headers})
 
 
 @app.get("/healthz")
-def healthz() -> dict:
+async def healthz() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/cache/stats")
+async def cache_stats(current_user: User = Depends(get_current_user)) -> dict:
+    return {
+        "volume": get_volume_cache().stats(),
+        "llm": get_response_cache().stats(),
+        "versioned": get_versioned_response_cache().stats(),
+    }
+
+
 @app.post("/auth/google/callback", response_model=SessionPayload)
-def google_callback(payload: GoogleCallbackRequest) -> SessionPayload:
+async def google_callback(payload: GoogleCallbackRequest) -> SessionPayload:
     service = AuthService()
-    user = service.resolve_user(payload.id_token, payload.dev_user)
-    session_payload = service.issue_session(user)
+    user = await service.resolve_user(payload.id_token, payload.dev_user)
+    session_payload = await service.issue_session(user)
     return SessionPayload(**session_payload)
 
 
+@app.post("/auth/logout", response_model=StatusResponse)
+async def logout(api_key: Optional[str] = Depends(api_key_scheme)) -> StatusResponse:
+    if not api_key or not await AuthService().revoke(api_key):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="유효하지 않은 API 키입니다")
+    return StatusResponse(status="revoked")
+
+
 @app.get("/blogs", response_model=list[BlogPayload])
-def list_blogs(current_user: User = Depends(get_current_user)) -> list[BlogPayload]:
-    service = BlogService()
-    return service.list_blogs(current_user.id)
+@query_budget(3)
+async def list_blogs(
+    request: Request,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor value of the previous page"),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    async def build() -> tuple[list[BlogPayload], dict[str, str]]:
+        service = BlogService()
+        try:
+            blogs, next_cursor = await service.list_blogs(current_user.id, limit=limit, cursor=cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+        return blogs, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    return await versioned_json(request, (blogs_key(current_user.id),), (limit, cursor), build)
 
 
 @app.post("/blogs", response_model=BlogPayload)
-def create_blog(payload: BlogCreateRequest, current_user: User = Depends(get_current_user)) -> BlogPayload:
+async def create_blog(payload: BlogCreateRequest, current_user: User = Depends(get_current_user)) -> BlogPayload:
     service = BlogService()
-    return service.create_blog(current_user.id, payload.naver_blog_id, payload.title)
+    return await service.create_blog(current_user.id, payload.naver_blog_id, payload.title)
 
 
 @app.post("/blogs/{blog_id}/verify", response_model=StatusResponse)
-def verify_blog(
+async def verify_blog(
     blog_id: int,
     payload: BlogVerifyRequest,
     current_user: User = Depends(get_current_user),
 ) -> StatusResponse:
     service = BlogService()
-    status_value, reason = service.verify_blog(
+    status_value, reason = await service.verify_blog(
         blog_id=blog_id,
         user_id=current_user.id,
         post_url=str(payload.post_url),
@@ -112,20 +254,21 @@ def verify_blog(
 
 
 @app.post("/blogs/{blog_id}/disown", response_model=StatusResponse)
-def disown_blog(blog_id: int, current_user: User = Depends(get_current_user)) -> StatusResponse:
+@query_budget(6)
+async def disown_blog(blog_id: int, current_user: User = Depends(get_current_user)) -> StatusResponse:
     service = BlogService()
-    status_value, reason = service.disown_blog(blog_id, current_user.id)
+    status_value, reason = await service.disown_blog(blog_id, current_user.id)
     return StatusResponse(status=status_value, reason=reason)
 
 
 @app.post("/blogs/{blog_id}/collaborators", response_model=CollaboratorResponse)
-def invite_collaborator(
+async def invite_collaborator(
     blog_id: int,
     payload: CollaboratorInviteRequest,
     current_user: User = Depends(get_current_user),
 ) -> CollaboratorResponse:
     service = BlogService()
-    result = service.invite_collaborator(blog_id, current_user.id, payload.email)
+    result = await service.invite_collaborator(blog_id, current_user.id, payload.email)
     if isinstance(result, tuple):
         status_value, reason = result
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=reason or status_value)
@@ -133,85 +276,162 @@ def invite_collaborator(
 
 
 @app.delete("/blogs/{blog_id}/collaborators/{collab_id}", response_model=StatusResponse)
-def revoke_collaborator(
+async def revoke_collaborator(
     blog_id: int,
     collab_id: int,
     current_user: User = Depends(get_current_user),
 ) -> StatusResponse:
     service = BlogService()
-    status_value, reason = service.revoke_collaborator(blog_id, current_user.id, collab_id)
+    status_value, reason = await service.revoke_collaborator(blog_id, current_user.id, collab_id)
     if status_value == "forbidden":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=reason)
     return StatusResponse(status=status_value, reason=reason)
 
 
 @app.get("/blogs/{blog_id}/collaborators", response_model=CollaboratorsResponse)
-def list_collaborators(blog_id: int, current_user: User = Depends(get_current_user)) -> CollaboratorsResponse:
-    service = BlogService()
-    collaborators = service.list_collaborators(blog_id)
-    return CollaboratorsResponse(collaborators=collaborators)
+@query_budget(3)
+async def list_collaborators(
+    request: Request,
+    blog_id: int,
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    async def build() -> tuple[CollaboratorsResponse, dict[str, str]]:
+        collaborators = await BlogService().list_collaborators(blog_id)
+        return CollaboratorsResponse(collaborators=collaborators), {}
+
+    return await versioned_json(request, (collaborators_key(blog_id),), (), build)
 
 
 @app.post("/keywords/extract", response_model=CandidatesResponse)
-def keywords_extract(payload: KeywordDraftRequest, current_user: User = Depends(get_current_user)) -> CandidatesResponse:
+async def keywords_extract(
+    payload: KeywordDraftRequest,
+    use_cache: bool = Depends(use_response_cache),
+    current_user: User = Depends(get_current_user),
+) -> CandidatesResponse:
     service = KeywordService()
-    candidates = service.extract_candidates(payload.draft)
+    candidates = await service.extract_candidates(current_user.id, payload.draft, use_cache=use_cache)
     return CandidatesResponse(candidates=candidates)
 
 
 @app.post("/keywords/volume", response_model=KeywordVolumeResponse)
-def keywords_volume(payload: KeywordVolumeRequest, current_user: User = Depends(get_current_user)) -> KeywordVolumeResponse:
+@query_budget(5)
+async def keywords_volume(payload: KeywordVolumeRequest, current_user: User = Depends(get_current_user)) -> KeywordVolumeResponse:
     service = KeywordService()
-    volumes = service.volumes(payload.keywords)
+    volumes = await service.volumes(payload.keywords)
     return KeywordVolumeResponse(volumes=volumes)
 
 
 @app.get("/curve", response_model=CurveResponse)
-def curve(
+@query_budget(13)
+async def curve(
+    request: Request,
     refresh: bool = Query(default=False),
     keywords: Optional[str] = Query(default=None, description="Comma separated keyword list"),
     current_user: User = Depends(get_current_user),
-) -> CurveResponse:
+) -> Response:
     service = CurveService()
     keywords_list = [kw.strip() for kw in keywords.split(",") if kw.strip()] if keywords else []
-    model, params, predictions = service.refresh_and_predict(keywords_list, force_refresh=refresh)
-    return CurveResponse(updated_at=model.updated_at, model_summary=params, predict=predictions)
+
+    async def build() -> tuple[CurveResponse, dict[str, str]]:
+        model, predictions = await service.refresh_and_predict(keywords_list, force_refresh=refresh)
+        return CurveResponse(updated_at=model.updated_at, model_summary=model.params, predict=predictions), {}
+
+    if refresh:
+        payload, _ = await build()
+        return JSONResponse(jsonable_encoder(payload))
+    # Predictions move with the refit and with the volume month they were looked up for.
+    variant = (tuple(keywords_list), service.volume_cache.naver.volume_month())
+    return await versioned_json(request, (CURVE,), variant, build)
+
+
+@app.post("/ranks/refresh", response_model=RankRefreshResponse)
+async def ranks_refresh(current_user: User = Depends(get_current_user)) -> RankRefreshResponse:
+    service = RankService()
+    summary = await service.refresh_ranks(current_user.id)
+    return RankRefreshResponse(**summary)
+
+
+@app.post("/jobs", response_model=JobPayload, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(payload: JobCreateRequest, current_user: User = Depends(get_current_user)) -> JobPayload:
+    job = await get_job_queue().enqueue(payload.kind, payload.payload, user_id=current_user.id)
+    return JobPayload(**job_payload(job))
+
+
+@app.get("/jobs/{job_id}", response_model=JobPayload)
+async def get_job(job_id: int, current_user: User = Depends(get_current_user)) -> JobPayload:
+    job = await get_job_queue().get(job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="작업을 찾을 수 없습니다")
+    return JobPayload(**job_payload(job))
 
 
 @app.post("/references/external", response_model=ExternalReferencesResponse)
-def references_external(
+@query_budget(4)
+async def references_external(
     payload: ExternalReferencesRequest,
     current_user: User = Depends(get_current_user),
 ) -> ExternalReferencesResponse:
     service = ReferenceService()
-    cards = service.external_cards(payload.keyword, [str(url) for url in payload.urls])
+    cards = await service.external_cards(payload.keyword, [str(url) for url in payload.urls])
     return ExternalReferencesResponse(cards=cards)
 
 
 @app.get("/references/myblog", response_model=MyBlogReferencesResponse)
-def references_myblog(current_user: User = Depends(get_current_user)) -> MyBlogReferencesResponse:
-    service = ReferenceService()
-    cards = service.my_blog_cards()
-    return MyBlogReferencesResponse(cards=cards)
+@query_budget(3)
+async def references_myblog(request: Request, current_user: User = Depends(get_current_user)) -> Response:
+    async def build() -> tuple[MyBlogReferencesResponse, dict[str, str]]:
+        cards = await ReferenceService().my_blog_cards(current_user.id)
+        return MyBlogReferencesResponse(cards=cards), {}
+
+    return await versioned_json(request, (MY_BLOG,), (current_user.id,), build)
 
 
 @app.post("/outline/plan", response_model=OutlineResponse)
-def outline_plan(payload: OutlineRequest, current_user: User = Depends(get_current_user)) -> OutlineResponse:
+async def outline_plan(
+    payload: OutlineRequest,
+    use_cache: bool = Depends(use_response_cache),
+    current_user: User = Depends(get_current_user),
+) -> OutlineResponse:
     service = OutlineService()
-    outline, evidence = service.create_outline(
+    outline, evidence = await service.create_outline(
         draft=payload.draft,
         keyword=payload.keyword,
         volume=payload.volume.total,
-        selected_refs=[ref.model_dump(exclude_none=True) for ref in payload.selected_refs],
+        selected_refs=[ref.model_dump(mode="json", exclude_none=True) for ref in payload.selected_refs],
+        use_cache=use_cache,
     )
     return OutlineResponse(outline=outline, evidence_requests=evidence)
 
 
 @app.post("/compose_with_research", response_model=ComposeResponse)
-def compose_with_research(payload: ComposeRequest, current_user: User = Depends(get_current_user)) -> ComposeResponse:
+async def compose_with_research(
+    payload: ComposeRequest,
+    use_cache: bool = Depends(use_response_cache),
+    current_user: User = Depends(get_current_user),
+) -> ComposeResponse:
     service = ComposeService()
-    result = service.compose(payload.draft, payload.keyword, [item.model_dump() for item in payload.outline])
+    result = await service.compose(
+        payload.draft, payload.keyword, [item.model_dump() for item in payload.outline], use_cache=use_cache
+    )
     return ComposeResponse(**result)
 
 
+@app.post("/compose_with_research/stream")
+async def compose_with_research_stream(
+    payload: ComposeRequest,
+    use_cache: bool = Depends(use_response_cache),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    service = ComposeService()
+    events = service.stream(
+        payload.draft, payload.keyword, [item.model_dump() for item in payload.outline], use_cache=use_cache
+    )
+
+    async def ndjson():
+        async for event in events:
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 __all__ = ["app"]
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Awaitable, Callable, Iterator, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BACKGROUND_ROUTE = "<background>"
+UNMATCHED_ROUTE = "<unmatched>"
+
+T = TypeVar("T")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in items)
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition layout."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # Per label set: one count per bucket, then +Inf count and sum.
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(series[-2]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        bounds = [f'le="{bound}"' for bound in self.buckets] + ['le="+Inf"']
+        for labels, series in items:
+            for bound, count in zip(bounds, series):
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, bound)} {_number(count)}")
+            plain = _labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{plain} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{plain} {_number(series[-2])}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram("plog_http_request_duration_seconds", "Request latency by route.", ("method", "route"))
+REQUESTS = Counter("plog_http_requests_total", "Requests by route and status code.", ("method", "route", "status"))
+DB_QUERIES = Counter("plog_db_queries_total", "SQL statements executed, by route.", ("route",))
+DB_SECONDS = Counter("plog_db_query_seconds_total", "Time spent in SQL statements, by route.", ("route",))
+PROVIDER_LATENCY = Histogram(
+    "plog_provider_call_duration_seconds", "External provider call latency.", ("provider", "call")
+)
+PROVIDER_ERRORS = Counter("plog_provider_errors_total", "External provider calls that raised.", ("provider", "call"))
+BUDGET_OVERRUNS = Counter(
+    "plog_query_budget_exceeded_total", "Requests that issued more queries than their route's budget.", ("route",)
+)
+METRICS = (REQUEST_LATENCY, REQUESTS, DB_QUERIES, DB_SECONDS, BUDGET_OVERRUNS, PROVIDER_LATENCY, PROVIDER_ERRORS)
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+@dataclass
+class RequestTimings:
+    """Time spent by one request in the database and in each provider.
+
+    Provider time is summed over calls, so calls that ran concurrently can
+    add up to more than the request itself.
+    """
+
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    # Statements issued inside ``outside_budget`` blocks, such as authentication.
+    unbudgeted_queries: int = 0
+    exempt_depth: int = 0
+    providers: dict[str, float] = field(default_factory=dict)
+    # Statement shapes, only counted in query debug mode.
+    statements: dict[str, int] = field(default_factory=dict)
+    scope: Scope = field(default_factory=dict, repr=False)
+
+    @property
+    def budget(self) -> int | None:
+        """``query_budget`` of the matched endpoint, once routing has run."""
+        endpoint = getattr(self.scope.get("route"), "endpoint", None)
+        return getattr(endpoint, "query_budget", None)
+
+    @property
+    def budgeted_queries(self) -> int:
+        return self.db_queries - self.unbudgeted_queries
+
+    def server_timing(self, total_seconds: float) -> str:
+        entries = [
+            f"app;dur={total_seconds * 1000:.1f}",
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+        ]
+        entries.extend(f"{name};dur={seconds * 1000:.1f}" for name, seconds in sorted(self.providers.items()))
+        return ", ".join(entries)
+
+
+_current_timings: ContextVar[RequestTimings | None] = ContextVar("plog_request_timings", default=None)
+
+
+def current_timings() -> RequestTimings | None:
+    return _current_timings.get()
+
+
+def record_query(seconds: float) -> None:
+    timings = _current_timings.get()
+    if timings is None:
+        DB_QUERIES.inc(BACKGROUND_ROUTE)
+        DB_SECONDS.inc(BACKGROUND_ROUTE, amount=seconds)
+        return
+    timings.db_queries += 1
+    timings.db_seconds += seconds
+    if timings.exempt_depth:
+        timings.unbudgeted_queries += 1
+
+
+@contextmanager
+def outside_budget() -> Iterator[None]:
+    """Keep the block's statements out of the current route's query budget."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    timings.exempt_depth += 1
+    try:
+        yield
+    finally:
+        timings.exempt_depth -= 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count statements and their time against the request that issued them."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("plog_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        record_query(time.perf_counter() - conn.info["plog_query_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context) -> None:
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("plog_query_started"):
+            record_query(time.perf_counter() - connection.info["plog_query_started"].pop())
+
+
+def timed(provider: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Record an async provider method's latency, per call and against the current request."""
+
+    def decorate(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        call = func.__name__
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                PROVIDER_ERRORS.inc(provider, call)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                PROVIDER_LATENCY.observe(elapsed, provider, call)
+                timings = _current_timings.get()
+                if timings is not None:
+                    timings.providers[provider] = timings.providers.get(provider, 0.0) + elapsed
+
+        return wrapper
+
+    return decorate
+
+
+def _route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and reports it per route template.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware`` so streamed responses pass
+    through untouched; the ``Server-Timing`` header is written with the
+    response start, so for streams it covers the work done before the first
+    chunk.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True) -> None:
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings(scope=scope)
+        token = _current_timings.set(timings)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            route = _route_label(scope)
+            REQUEST_LATENCY.observe(time.perf_counter() - started, scope["method"], route)
+            REQUESTS.inc(scope["method"], route, str(status_code))
+            DB_QUERIES.inc(route, amount=timings.db_queries)
+            DB_SECONDS.inc(route, amount=timings.db_seconds)
+            budget = timings.budget
+            if budget is not None and timings.budgeted_queries > budget:
+                BUDGET_OVERRUNS.inc(route)
+
+
+__all__ = [
+    "Counter",
+    "Histogram",
+    "MetricsMiddleware",
+    "PROMETHEUS_CONTENT_TYPE",
+    "RequestTimings",
+    "current_timings",
+    "instrument_engine",
+    "outside_budget",
+    "record_query",
+    "render_metrics",
+    "timed",
+]
@@ -4,7 +4,7 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, Index, SQLModel
 
 
 class TimestampedModel(SQLModel):
@@ -22,6 +22,13 @@ class User(TimestampedModel, table=True):
     display_name: Optional[str] = None
 
 
+class ApiKey(TimestampedModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    key_hash: str = Field(index=True, unique=True)
+    revoked_at: Optional[datetime] = None
+
+
 class BlogStatus(str, Enum):
     PENDING = "pending"
     VERIFIED = "verified"
@@ -29,6 +36,8 @@ class BlogStatus(str, Enum):
 
 
 class Blog(TimestampedModel, table=True):
+    __table_args__ = (Index("ix_blog_owner_user_id_created_at", "owner_user_id", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_user_id: int = Field(foreign_key="user.id")
     naver_blog_id: str
@@ -39,7 +48,7 @@ class Blog(TimestampedModel, table=True):
 
 class BlogVerification(TimestampedModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    blog_id: int = Field(foreign_key="blog.id")
+    blog_id: int = Field(foreign_key="blog.id", index=True)
     title_token: str
     body_token: str
     post_url: Optional[str] = None
@@ -74,6 +83,11 @@ class Post(TimestampedModel, table=True):
 
 
 class RankHistory(TimestampedModel, table=True):
+    __table_args__ = (
+        Index("ix_rankhistory_post_keyword_measured_at", "post_id", "keyword", "measured_at"),
+        Index("ix_rankhistory_measured_at", "measured_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     post_id: int = Field(foreign_key="post.id")
     keyword: str
@@ -82,6 +96,52 @@ class RankHistory(TimestampedModel, table=True):
     mode: str = Field(default="sim")
 
 
+class RankLatest(SQLModel, table=True):
+    """Most recent RankHistory row per (post, keyword), upserted with every write."""
+
+    __table_args__ = (Index("ix_ranklatest_keyword", "keyword"),)
+
+    post_id: int = Field(foreign_key="post.id", primary_key=True)
+    keyword: str = Field(primary_key=True)
+    rank: int
+    measured_at: datetime
+    mode: str = Field(default="sim")
+
+
+class RankRollup(SQLModel, table=True):
+    """RankHistory aggregated per post, keyword and day ("2025-08-10") or month ("2025-08")."""
+
+    __table_args__ = (Index("ix_rankrollup_period_bucket", "period", "bucket"),)
+
+    post_id: int = Field(foreign_key="post.id", primary_key=True)
+    keyword: str = Field(primary_key=True)
+    period: str = Field(primary_key=True, description="day | month")
+    bucket: str = Field(primary_key=True)
+    samples: int
+    rank_sum: int
+    rank_min: int
+    rank_max: int
+    found: int = Field(description="samples ranked inside the Top1000")
+
+
+class PostImprovement(SQLModel, table=True):
+    """How far a post climbed for its main keyword: expected rank at publish minus latest rank (PRD 4.4).
+
+    Refreshed with every rank write; only posts with an expected rank and a
+    measurement have a row.
+    """
+
+    __table_args__ = (Index("ix_postimprovement_owner_improvement", "owner_user_id", "improvement", "measured_at"),)
+
+    post_id: int = Field(foreign_key="post.id", primary_key=True)
+    owner_user_id: int = Field(foreign_key="user.id")
+    keyword: str
+    expected_rank: int
+    latest_rank: int
+    improvement: int
+    measured_at: datetime
+
+
 class CurveModel(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     params_json: str
@@ -89,6 +149,8 @@ class CurveModel(SQLModel, table=True):
 
 
 class KeywordVolume(TimestampedModel, table=True):
+    __table_args__ = (Index("uq_keywordvolume_keyword_month", "keyword", "month", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     keyword: str = Field(index=True)
     month: str
@@ -96,6 +158,11 @@ class KeywordVolume(TimestampedModel, table=True):
 
 
 class RefCardExternal(TimestampedModel, table=True):
+    __table_args__ = (
+        Index("uq_refcardexternal_keyword_url", "keyword", "url", unique=True),
+        Index("ix_refcardexternal_updated_at", "updated_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     keyword: str = Field(index=True)
     title: str
@@ -108,9 +175,66 @@ class RefCardExternal(TimestampedModel, table=True):
 
 class RefCardMyBlog(TimestampedModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    post_id: int = Field(foreign_key="post.id")
+    post_id: int = Field(foreign_key="post.id", index=True)
     url: str
     title: Optional[str] = None
     summary: Optional[str] = None
     postdate: Optional[str] = None
 
+
+class KeywordDraft(SQLModel, table=True):
+    """A draft already counted in its user's ``KeywordTermCount`` rows, by content digest."""
+
+    __table_args__ = (Index("uq_keyworddraft_user_id_digest", "user_id", "digest", unique=True),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    digest: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class KeywordTermCount(SQLModel, table=True):
+    """Number of a user's drafts containing ``term`` (a word, or "left right" for a word pair)."""
+
+    __table_args__ = (Index("uq_keywordtermcount_user_id_term", "user_id", "term", unique=True),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    term: str
+    documents: int = Field(default=0)
+
+
+class DataVersion(SQLModel, table=True):
+    """Write counter of one cacheable read ("blogs:3", "collaborators:12", "myblog", "curve", "apikeys")."""
+
+    key: str = Field(primary_key=True)
+    version: int = Field(default=0)
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(TimestampedModel, table=True):
+    __table_args__ = (
+        Index("ix_job_status_run_after", "status", "run_after"),
+        Index("ix_job_dedupe_key_status", "dedupe_key", "status"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+    kind: str
+    payload_json: str = Field(default="{}")
+    dedupe_key: str
+    status: JobStatus = Field(default=JobStatus.PENDING)
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = Field(default=None, description="lease of the worker running the job")
+    finished_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    result_json: Optional[str] = None
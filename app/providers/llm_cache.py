@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from ..settings import get_settings
+from .registry import get_registry
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    """Content-addressed cache of LLM responses: an in-memory LRU over a size-capped directory.
+
+    Keys hash the operation, the normalized inputs and the prompt template
+    version, so editing ``prompts/*.md`` naturally invalidates old entries.
+    Disk entries are evicted least-recently-used once ``disk_max_bytes`` is
+    exceeded.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        memory_entries: int,
+        disk_max_bytes: int,
+        version: Callable[[], str],
+    ) -> None:
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.version = version
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._disk: OrderedDict[str, int] | None = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+
+    def key(self, operation: str, payload: dict) -> str:
+        material = json.dumps(
+            {"op": operation, "prompt_version": self.version(), "input": payload},
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Any | None:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+        value = await asyncio.to_thread(self._read_disk, key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    async def put(self, key: str, value: Any) -> None:
+        self._remember(key, value)
+        await asyncio.to_thread(self._write_disk, key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    async def get_or_compute(
+        self,
+        operation: str,
+        payload: dict,
+        compute: Callable[[], Awaitable[Any]],
+        use_cache: bool = True,
+    ) -> Any:
+        """Return the cached response, or compute and store it. ``use_cache=False`` forces a refresh."""
+        key = self.key(operation, payload)
+        if use_cache:
+            cached = await self.get(key)
+            if cached is not None:
+                return cached
+        value = await compute()
+        await self.put(key, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "prompt_version": self.version(),
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_entries": len(self._disk or {}),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+                "disk_hits": self.disk_hits,
+                "disk_evictions": self.disk_evictions,
+                "misses": self.misses,
+            }
+
+    def _remember(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _disk_index(self) -> OrderedDict[str, int]:
+        # Built lazily from the directory, oldest access first; callers hold the lock.
+        if self._disk is None:
+            entries = []
+            for path in self.directory.glob("*/*.json"):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._disk = OrderedDict((key, size) for _, key, size in entries)
+            self._disk_bytes = sum(self._disk.values())
+        return self._disk
+
+    def _read_disk(self, key: str) -> Any | None:
+        path = self._path(key)
+        with self._lock:
+            index = self._disk_index()
+            if key not in index:
+                return None
+            index.move_to_end(key)
+        try:
+            value = json.loads(path.read_bytes())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            index = self._disk_index()
+            self._disk_bytes += len(data) - index.pop(key, 0)
+            index[key] = len(data)
+            while self._disk_bytes > self.disk_max_bytes and len(index) > 1:
+                evicted, size = index.popitem(last=False)
+                self._disk_bytes -= size
+                self.disk_evictions += 1
+                self._path(evicted).unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> ResponseCache:
+    settings = get_settings()
+    return ResponseCache(
+        Path(settings.llm_cache_dir),
+        memory_entries=settings.llm_cache_memory_entries,
+        disk_max_bytes=settings.llm_cache_max_bytes,
+        version=lambda: get_registry().version,
+    )
+
+
+__all__ = ["ResponseCache", "get_response_cache", "normalize_text"]
@@ -3,8 +3,32 @@ from __future__ import annotations
 import hashlib
 from datetime import datetime
 from typing import Iterable
+from urllib.parse import parse_qs, urlsplit
 
+import httpx
+
+from ..metrics import timed
 from ..settings import get_settings
+from .web import PageOutline
+
+BLOG_SEARCH_PATH = "/v1/search/blog.json"
+SEARCH_PAGE_SIZE = 100
+SEARCH_TOP_N = 1000
+NOT_FOUND_RANK = SEARCH_TOP_N + 1
+
+
+def normalize_post_url(url: str) -> str:
+    """Reduce a Naver blog post URL to a comparable ``host/blog/logNo`` key."""
+    parsed = urlsplit(url.strip())
+    host = parsed.netloc.lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if host == "blog.naver.com":
+        query = parse_qs(parsed.query)
+        if query.get("blogId") and query.get("logNo"):
+            return f"{host}/{query['blogId'][0]}/{query['logNo'][0]}"
+    return f"{host}{parsed.path.rstrip('/')}"
 
 
 class NaverSearchProvider:
@@ -20,26 +44,66 @@ class NaverSearchProvider:
             and self.settings.naver_search_client_secret
         )
 
-    def monthly_search_volume(self, keyword: str) -> dict:
+    def volume_month(self) -> str:
+        return datetime.utcnow().strftime("%Y-%m")
+
+    @timed("naver")
+    async def monthly_search_volume(self, keyword: str) -> dict:
         seed = int(hashlib.sha1(keyword.encode("utf-8")).hexdigest(), 16)
         base = 3000 + (seed % 7000)
-        month = datetime.utcnow().strftime("%Y-%m")
-        return {"month": month, "total": base}
+        return {"month": self.volume_month(), "total": base}
+
+    @timed("naver")
+    async def blog_search_links(
+        self,
+        client: httpx.AsyncClient,
+        keyword: str,
+        start: int,
+        display: int = SEARCH_PAGE_SIZE,
+    ) -> list[str]:
+        response = await client.get(
+            f"{self.settings.naver_search_base_url.rstrip('/')}{BLOG_SEARCH_PATH}",
+            params={"query": keyword, "display": display, "start": start, "sort": "sim"},
+            headers={
+                "X-Naver-Client-Id": self.settings.naver_search_client_id or "",
+                "X-Naver-Client-Secret": self.settings.naver_search_client_secret or "",
+            },
+        )
+        response.raise_for_status()
+        return [item.get("link", "") for item in response.json().get("items", [])]
+
+    def stub_rank(self, keyword: str, url: str) -> int:
+        seed = int(hashlib.sha1(f"{keyword}|{normalize_post_url(url)}".encode("utf-8")).hexdigest(), 16)
+        rank = 1 + (seed % 1200)
+        return rank if rank <= SEARCH_TOP_N else NOT_FOUND_RANK
 
-    def evaluate_external_refs(self, keyword: str, urls: Iterable[str]) -> list[dict]:
+    @timed("naver")
+    async def evaluate_external_refs(self, keyword: str, pages: Iterable[PageOutline]) -> list[dict]:
+        """Write card copy for pages that already passed structural scoring, best first."""
         cards: list[dict] = []
-        for idx, url in enumerate(urls):
+        for idx, page in enumerate(pages):
+            headings = [text for _, text in page.headings[:3]]
             cards.append(
                 {
-                    "title": f"{keyword} 임상 인사이트 #{idx+1}",
-                    "url": url,
-                    "postdate": datetime.utcnow().strftime("%Y-%m-%d"),
-                    "summary": f"{keyword} 관련 주요 정보를 요약한 참고 글입니다.",
+                    "title": page.title or f"{keyword} 임상 인사이트 #{idx+1}",
+                    "url": page.url,
+                    "postdate": page.postdate or datetime.utcnow().strftime("%Y-%m-%d"),
+                    "summary": (
+                        f"{keyword} 관련 글로 {', '.join(headings)} 순서로 구성되어 있습니다."
+                        if headings
+                        else f"{keyword} 관련 주요 정보를 요약한 참고 글입니다."
+                    ),
                     "why": "광고성이 낮고 환자 반응이 좋은 구조",
                     "flags": ["verified"] if idx == 0 else [],
                 }
             )
-        return cards[:3]
+        return cards
 
 
-__all__ = ["NaverSearchProvider"]
+__all__ = [
+    "NaverSearchProvider",
+    "NOT_FOUND_RANK",
+    "SEARCH_PAGE_SIZE",
+    "SEARCH_TOP_N",
+    "normalize_post_url",
+]
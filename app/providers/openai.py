@@ -1,16 +1,12 @@
 from __future__ import annotations
 
-import json
-import re
-from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime
-from pathlib import Path
-from typing import Iterable, List
+from typing import Iterable
 
+from ..metrics import timed
 from ..settings import get_settings
-
-DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+from .registry import get_registry
 
 
 @dataclass
@@ -33,24 +29,23 @@ class OpenAIProvider:
 
     def __init__(self) -> None:
         self.settings = get_settings()
+        self.registry = get_registry()
 
     @property
     def is_stub(self) -> bool:
         return not bool(self.settings.openai_api_key)
 
-    def keyword_candidates(self, draft: str) -> list[dict]:
+    @timed("openai")
+    async def keyword_candidates(self, draft: str, ranked_terms: list[str]) -> list[dict]:
+        """``ranked_terms`` is the TF-IDF pre-ranking of the draft, best first."""
         draft = draft.strip()
         if not draft:
             return []
-        sample_path = DATA_DIR / "sample_candidates.json"
-        if sample_path.exists():
-            try:
-                sample = json.loads(sample_path.read_text(encoding="utf-8"))
-                if sample.get("candidates"):
-                    return sample["candidates"]
-            except json.JSONDecodeError:
-                pass
-        tokens = self._extract_keywords(draft, top_k=8)
+        if self.settings.dev_sample_candidates:
+            sample = self.registry.fixture("sample_candidates")
+            if sample and sample.get("candidates"):
+                return sample["candidates"]
+        tokens = ranked_terms[:8]
         results: list[dict] = []
         for idx, token in enumerate(tokens, start=1):
             fit = round(min(0.95, 0.55 + (0.45 * (len(tokens) - idx) / max(len(tokens) - 1, 1))), 2)
@@ -63,7 +58,8 @@ class OpenAIProvider:
             )
         return results
 
-    def build_outline(
+    @timed("openai")
+    async def build_outline(
         self,
         draft: str,
         keyword: str,
@@ -103,68 +99,61 @@ class OpenAIProvider:
             )
         return sections, evidence
 
-    def compose_with_research(
-        self,
-        draft: str,
-        keyword: str,
-        outline: Iterable[OutlineSection],
-    ) -> dict:
-        sections = list(outline)
-        now_year = datetime.utcnow().year
-        body_parts: list[str] = []
-        image_suggestions: list[dict] = []
-        references: list[dict] = []
-        for section in sections:
-            heading = f"## {section.title}"
-            paragraphs = [
-                f"{keyword} 환자들이 자주 묻는 질문을 기반으로 최신 근거를 요약했습니다.",
-                "[대한피부과학회, {year}] 권고를 참고해 실제 진료 팁을 덧붙였습니다.".format(year=now_year - 1),
-            ]
-            body_parts.append("\n".join([heading, "", *paragraphs]))
-            image_suggestions.append(
-                {
-                    "section": section.title,
-                    "prompt": f"의료진 관점에서 {section.title}을 시각화한 교육용 인포그래픽",
-                    "ratio": "4:3" if int(section.section_id.split("-")[-1]) % 2 else "16:9",
-                    "style": "clean infographic",
-                    "alt": f"{section.title} 설명을 돕는 이미지",
-                }
-            )
-            references.append(
+    @timed("openai")
+    async def compose_head(self, draft: str, keyword: str, outline: list[OutlineSection]) -> dict:
+        return {
+            "titles": [f"{keyword} 진료실 가이드", f"{keyword} 환자를 위한 체크리스트"],
+            "overview": f"{keyword} 환자 상담을 준비하는 의료진을 위한 요약입니다.",
+        }
+
+    @timed("openai")
+    async def collect_evidence(self, keyword: str, outline: list[OutlineSection]) -> dict[str, list[dict]]:
+        """Gather the shared evidence bundle once, keyed by ``section_id``."""
+        return {
+            section.section_id: [
                 {
                     "title": f"{keyword} 관리 가이드라인",
                     "url": "https://pubmed.ncbi.nlm.nih.gov/000000/",
                     "pmid": "000000",
                 }
-            )
+            ]
+            for section in outline
+        }
+
+    @timed("openai")
+    async def compose_section(
+        self,
+        draft: str,
+        keyword: str,
+        section: OutlineSection,
+        evidence: list[dict],
+    ) -> dict:
+        now_year = datetime.utcnow().year
+        heading = f"## {section.title}"
+        paragraphs = [
+            f"{keyword} 환자들이 자주 묻는 질문을 기반으로 최신 근거를 요약했습니다.",
+            "[대한피부과학회, {year}] 권고를 참고해 실제 진료 팁을 덧붙였습니다.".format(year=now_year - 1),
+        ]
+        return {
+            "body": "\n".join([heading, "", *paragraphs]),
+            "image_suggestion": {
+                "section": section.title,
+                "prompt": f"의료진 관점에서 {section.title}을 시각화한 교육용 인포그래픽",
+                "ratio": "4:3" if int(section.section_id.split("-")[-1]) % 2 else "16:9",
+                "style": "clean infographic",
+                "alt": f"{section.title} 설명을 돕는 이미지",
+            },
+        }
+
+    @timed("openai")
+    async def compose_tail(self, keyword: str, outline: list[OutlineSection]) -> dict:
         return {
-            "titles": [f"{keyword} 진료실 가이드", f"{keyword} 환자를 위한 체크리스트"],
-            "overview": f"{keyword} 환자 상담을 준비하는 의료진을 위한 요약입니다.",
-            "body": "\n\n".join(body_parts),
             "checklist": ["초기 증상 확인", "생활습관 지도", "필요시 전문 치료 연계"],
             "faq": [
                 f"{keyword} 환자가 가장 걱정하는 부분은?",
                 f"{keyword} 관리에서 주의할 생활 습관은?",
             ],
-            "image_suggestions": image_suggestions,
-            "references": references,
         }
 
-    def _extract_keywords(self, draft: str, top_k: int = 8) -> List[str]:
-        text = re.sub(r"[^0-9A-Za-z가-힣\s]", " ", draft)
-        tokens = [tok for tok in text.split() if len(tok) >= 2]
-        if not tokens:
-            return []
-        scores = Counter(tokens)
-        sorted_tokens = [token for token, _ in scores.most_common(top_k)]
-        # ensure keyword uniqueness and keep ordering stable
-        seen: set[str] = set()
-        unique_tokens: list[str] = []
-        for token in sorted_tokens:
-            if token not in seen:
-                unique_tokens.append(token)
-                seen.add(token)
-        return unique_tokens[:top_k]
-
 
 __all__ = ["OpenAIProvider", "OutlineSection", "EvidenceRequest"]
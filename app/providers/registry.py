@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+PROMPTS_DIR = ROOT_DIR / "prompts"
+DATA_DIR = ROOT_DIR / "data"
+
+logger = logging.getLogger(__name__)
+
+
+class Registry:
+    """In-memory copy of ``prompts/*.md`` and ``data/*.json``, reloaded when a file's mtime changes.
+
+    Request handlers only read the dictionaries; ``reload`` runs at startup and
+    from the background ``watch`` loop. The prompt texts are not sent anywhere
+    by the stub provider yet; they only feed ``version``, which keys the LLM
+    cache so edited prompts never reuse old answers.
+    """
+
+    def __init__(self, prompts_dir: Path = PROMPTS_DIR, data_dir: Path = DATA_DIR) -> None:
+        self.prompts_dir = prompts_dir
+        self.data_dir = data_dir
+        self.version = ""
+        self._prompts: dict[str, str] = {}
+        self._fixtures: dict[str, Any] = {}
+        self._mtimes: dict[Path, int] = {}
+        self._lock = threading.Lock()
+        self.reload()
+
+    def fixture(self, name: str) -> Any | None:
+        return self._fixtures.get(name)
+
+    def reload(self) -> bool:
+        with self._lock:
+            paths = sorted(self.prompts_dir.glob("*.md")) + sorted(self.data_dir.glob("*.json"))
+            mtimes = {path: path.stat().st_mtime_ns for path in paths}
+            if mtimes == self._mtimes:
+                return False
+            prompts = {name: text for name, text in self._prompts.items() if self.prompts_dir / f"{name}.md" in mtimes}
+            fixtures = {name: value for name, value in self._fixtures.items() if self.data_dir / f"{name}.json" in mtimes}
+            for path, mtime in mtimes.items():
+                if self._mtimes.get(path) == mtime:
+                    continue
+                text = path.read_text(encoding="utf-8")
+                if path.suffix == ".md":
+                    prompts[path.stem] = text
+                    continue
+                try:
+                    fixtures[path.stem] = json.loads(text)
+                except json.JSONDecodeError:
+                    logger.warning("registry: keeping previous %s, file is not valid JSON", path.name)
+            digest = hashlib.sha256()
+            for name in sorted(prompts):
+                digest.update(name.encode("utf-8"))
+                digest.update(prompts[name].encode("utf-8"))
+            self._prompts, self._fixtures, self._mtimes = prompts, fixtures, mtimes
+            self.version = digest.hexdigest()[:16]
+            return True
+
+    async def watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except OSError:
+                logger.exception("registry: reload failed")
+
+
+@lru_cache(maxsize=1)
+def get_registry() -> Registry:
+    return Registry()
+
+
+__all__ = ["Registry", "get_registry"]
@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+import httpx
+
+from ..settings import get_settings
+from .http import get_async_client
+
+_DATE = re.compile(r"(\d{4})[.\-/]\s*(\d{1,2})[.\-/]\s*(\d{1,2})")
+_SKIP_TAGS = frozenset({"script", "style", "noscript", "template"})
+_HEADING_TAGS = {"h2": 2, "h3": 3}
+# SmartEditor renders section titles as styled divs instead of <h2>/<h3>.
+_HEADING_CLASSES = {"se-section-sectionTitle": 2, "se_sectionTitle": 2, "se-section-quotation": 3}
+_DATE_CLASSES = ("se_publishDate", "blog_date", "date")
+_DATE_META = frozenset({"article:published_time", "og:regdate", "date", "pubdate"})
+_MAIN_FRAME = re.compile(rb"<iframe[^>]*\bid=[\"']mainFrame[\"'][^>]*>", re.IGNORECASE)
+_FRAME_SRC = re.compile(rb"\bsrc=[\"']([^\"']+)[\"']", re.IGNORECASE)
+_NAVER_POST_PATH = re.compile(r"^/([A-Za-z0-9_-]+)/(\d+)/?$")
+_META_CHARSET = re.compile(rb"<meta[^>]*?charset\s*=\s*[\"']?\s*([A-Za-z0-9_.:-]+)", re.IGNORECASE)
+# Browsers look for <meta charset> in the first 1024 bytes; so does the page decoder.
+_CHARSET_SNIFF_BYTES = 1024
+# Pages labelled EUC-KR are written with the UHC extensions browsers decode them with.
+_CHARSET_ALIASES = {"x-windows-949": "cp949", "windows-949": "cp949", "euc_kr": "cp949"}
+
+
+def site_key(url: str) -> str:
+    """Group URLs that belong to one site: one key per Naver/Tistory blog, otherwise per host."""
+    parsed = urlsplit(url.strip())
+    host = parsed.netloc.lower().split(":")[0]
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if host == "blog.naver.com":
+        blog_id = parse_qs(parsed.query).get("blogId", [None])[0]
+        if not blog_id:
+            segments = [segment for segment in parsed.path.split("/") if segment]
+            blog_id = segments[0] if segments and segments[0] != "PostView.naver" else None
+        if blog_id:
+            return f"{host}/{blog_id.lower()}"
+    return host
+
+
+def naver_post_view_url(url: str) -> str:
+    """Rewrite ``blog.naver.com/{blogId}/{logNo}`` to the PostView page its mainFrame iframe loads."""
+    parsed = urlsplit(url.strip())
+    if parsed.netloc.lower() in ("blog.naver.com", "www.blog.naver.com"):
+        match = _NAVER_POST_PATH.match(parsed.path)
+        if match:
+            return f"https://blog.naver.com/PostView.naver?blogId={match.group(1)}&logNo={match.group(2)}"
+    return url
+
+
+def page_decoder(header_charset: str | None, head: bytes) -> codecs.IncrementalDecoder:
+    """Decoder for a page body: the HTTP charset, else a ``<meta charset>`` in ``head``, else UTF-8.
+
+    Raises ``LookupError`` for a declared charset Python has no codec for.
+    """
+    label = header_charset
+    if not label:
+        match = _META_CHARSET.search(head[:_CHARSET_SNIFF_BYTES])
+        label = match.group(1).decode("ascii") if match else "utf-8"
+    name = codecs.lookup(_CHARSET_ALIASES.get(label.lower(), label)).name
+    return codecs.getincrementaldecoder(_CHARSET_ALIASES.get(name, name))(errors="replace")
+
+
+def parse_postdate(text: str) -> str | None:
+    match = _DATE.search(text)
+    if not match:
+        return None
+    year, month, day = (int(part) for part in match.groups())
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+@dataclass
+class PageOutline:
+    url: str
+    title: str | None = None
+    postdate: str | None = None
+    headings: list[tuple[int, str]] = field(default_factory=list)
+    text_chars: int = 0
+    images: int = 0
+    bytes_read: int = 0
+    truncated: bool = False
+    error: str | None = None
+
+
+class OutlineParser(HTMLParser):
+    """Incremental extractor for the title, post date, H2/H3 headings and rough body size.
+
+    Chunks are fed as they arrive, so nothing beyond what has been read needs
+    to be buffered. ``frame_src`` records Naver's ``mainFrame`` iframe, whose
+    target holds the actual post.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title_parts: list[str] = []
+        self.meta_title: str | None = None
+        self.postdate: str | None = None
+        self.headings: list[tuple[int, str]] = []
+        self.text_chars = 0
+        self.images = 0
+        self.frame_src: str | None = None
+        self._skip_depth = 0
+        self._in_title = False
+        self._capture: tuple[str, int, list[str]] | None = None
+        self._date_tag: str | None = None
+        self._date_parts: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        values = dict(attrs)
+        classes = (values.get("class") or "").split()
+        if tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            self._handle_meta(values)
+        elif tag == "img":
+            self.images += 1
+        elif tag == "iframe" and values.get("id") == "mainFrame" and values.get("src"):
+            self.frame_src = values["src"]
+        if self._capture is None:
+            level = _HEADING_TAGS.get(tag) or next((_HEADING_CLASSES[name] for name in classes if name in _HEADING_CLASSES), 0)
+            if level:
+                self._capture = (tag, level, [])
+        if self.postdate is None and self._date_tag is None and any(name in _DATE_CLASSES for name in classes):
+            self._date_tag = tag
+            self._date_parts = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if tag == "title":
+            self._in_title = False
+        if self._capture is not None and tag == self._capture[0]:
+            _, level, parts = self._capture
+            text = " ".join("".join(parts).split())
+            if text:
+                self.headings.append((level, text))
+            self._capture = None
+        if self._date_tag is not None and tag == self._date_tag:
+            self.postdate = parse_postdate("".join(self._date_parts))
+            self._date_tag = None
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth:
+            return
+        if self._in_title:
+            self.title_parts.append(data)
+            return
+        if self._capture is not None:
+            self._capture[2].append(data)
+        if self._date_tag is not None:
+            self._date_parts.append(data)
+        self.text_chars += len(data.strip())
+
+    @property
+    def title(self) -> str | None:
+        title = " ".join("".join(self.title_parts).split())
+        return self.meta_title or title or None
+
+    def _handle_meta(self, values: dict[str, str | None]) -> None:
+        name = (values.get("property") or values.get("name") or "").lower()
+        content = (values.get("content") or "").strip()
+        if not content:
+            return
+        if name == "og:title":
+            self.meta_title = content
+        elif name in _DATE_META and self.postdate is None:
+            self.postdate = parse_postdate(content)
+
+
+class PageFetcher:
+    """Fetches pages concurrently and extracts a ``PageOutline`` from each while streaming.
+
+    Each page is read up to ``max_bytes`` within ``timeout`` seconds, and at
+    most ``per_host`` requests run against one host at a time; the pooled
+    client bounds the total. Naver blog frames are followed once.
+    """
+
+    def __init__(self, per_host: int = 2, max_bytes: int = 512 * 1024, timeout: float = 5.0) -> None:
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._host_gates: dict[str, asyncio.Semaphore] = {}
+
+    async def fetch_many(self, urls: list[str], client: httpx.AsyncClient | None = None) -> list[PageOutline]:
+        client = client or get_async_client()
+        return list(await asyncio.gather(*(self.fetch(url, client) for url in urls)))
+
+    async def fetch(self, url: str, client: httpx.AsyncClient | None = None) -> PageOutline:
+        client = client or get_async_client()
+        page = PageOutline(url=url)
+        try:
+            await asyncio.wait_for(self._read(client, url, page), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            page.error = "timeout"
+        except httpx.HTTPError as exc:
+            page.error = type(exc).__name__
+        except (LookupError, ValueError, AssertionError) as exc:
+            # Unknown charsets and markup HTMLParser gives up on make one page unreachable, not the batch.
+            page.error = type(exc).__name__
+        return page
+
+    async def _read(self, client: httpx.AsyncClient, url: str, page: PageOutline) -> None:
+        parser = await self._stream(client, url, page)
+        if parser.frame_src and not parser.headings and not page.truncated:
+            # The outer Naver page is a frameset; the post itself lives in PostView.
+            title = parser.title
+            parser = await self._stream(client, urljoin(url, parser.frame_src), page)
+            page.title = parser.title or title
+        else:
+            page.title = parser.title
+        page.postdate = parser.postdate
+        page.headings = parser.headings
+        page.text_chars = parser.text_chars
+        page.images = parser.images
+
+    async def _stream(self, client: httpx.AsyncClient, url: str, page: PageOutline) -> OutlineParser:
+        parser = OutlineParser()
+        async with self._gate(url):
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                decoder = None
+                head = b""
+                async for chunk in response.aiter_bytes():
+                    remaining = self.max_bytes - page.bytes_read
+                    if len(chunk) >= remaining:
+                        chunk = chunk[:remaining]
+                        page.truncated = True
+                    page.bytes_read += len(chunk)
+                    if decoder is None:
+                        # Hold the first bytes back until a <meta charset> in them could be seen.
+                        head += chunk
+                        if len(head) < _CHARSET_SNIFF_BYTES and not page.truncated:
+                            continue
+                        decoder = page_decoder(response.charset_encoding, head)
+                        chunk = head
+                    parser.feed(decoder.decode(chunk))
+                    if page.truncated:
+                        break
+        if decoder is None:
+            decoder = page_decoder(response.charset_encoding, head)
+            parser.feed(decoder.decode(head))
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        return parser
+
+    def _gate(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        gate = self._host_gates.get(host)
+        if gate is None:
+            gate = self._host_gates[host] = asyncio.Semaphore(self.per_host)
+        return gate
+
+
+@dataclass
+class TokenScan:
+    url: str
+    found: set[str] = field(default_factory=set)
+    bytes_read: int = 0
+    truncated: bool = False
+    error: str | None = None
+
+
+class TokenScanner:
+    """Looks for verification tokens in a page without buffering it.
+
+    The body is scanned chunk by chunk; the last ``overlap`` bytes of each
+    chunk are carried into the next so a token split across a boundary still
+    matches. Reading stops as soon as every token has been seen or
+    ``max_bytes`` have been read. Naver post URLs are rewritten to their
+    PostView page, and any other ``mainFrame`` iframe is followed once.
+    """
+
+    overlap = 512
+
+    def __init__(self, max_bytes: int = 1024 * 1024, timeout: float = 5.0) -> None:
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+
+    async def scan(self, url: str, tokens: list[str], client: httpx.AsyncClient | None = None) -> TokenScan:
+        client = client or get_async_client()
+        result = TokenScan(url=naver_post_view_url(url))
+        try:
+            await asyncio.wait_for(self._scan(client, result, tokens), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            result.error = "timeout"
+        except httpx.HTTPError as exc:
+            result.error = type(exc).__name__
+        return result
+
+    async def _scan(self, client: httpx.AsyncClient, result: TokenScan, tokens: list[str]) -> None:
+        frame_src = await self._stream(client, result, tokens)
+        if frame_src and len(result.found) < len(set(tokens)) and not result.truncated:
+            result.url = naver_post_view_url(urljoin(result.url, frame_src))
+            await self._stream(client, result, tokens)
+
+    async def _stream(self, client: httpx.AsyncClient, result: TokenScan, tokens: list[str]) -> str | None:
+        needles = {token: token.encode("utf-8") for token in tokens if token}
+        frame_src: str | None = None
+        tail = b""
+        async with client.stream("GET", result.url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                remaining = self.max_bytes - result.bytes_read
+                if len(chunk) >= remaining:
+                    chunk = chunk[:remaining]
+                    result.truncated = True
+                result.bytes_read += len(chunk)
+                window = tail + chunk
+                for token, needle in needles.items():
+                    if token not in result.found and needle in window:
+                        result.found.add(token)
+                if frame_src is None:
+                    frame = _MAIN_FRAME.search(window)
+                    src = _FRAME_SRC.search(frame.group(0)) if frame else None
+                    if src:
+                        frame_src = src.group(1).decode("utf-8", "replace").replace("&amp;", "&")
+                if len(result.found) == len(needles) or result.truncated:
+                    break
+                tail = window[-self.overlap :]
+        return frame_src
+
+
+@lru_cache(maxsize=1)
+def get_token_scanner() -> TokenScanner:
+    settings = get_settings()
+    return TokenScanner(
+        max_bytes=settings.verification_fetch_max_bytes,
+        timeout=settings.verification_fetch_timeout_seconds,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_page_fetcher() -> PageFetcher:
+    settings = get_settings()
+    return PageFetcher(
+        per_host=settings.reference_fetch_per_host,
+        max_bytes=settings.reference_fetch_max_bytes,
+        timeout=settings.reference_fetch_timeout_seconds,
+    )
+
+
+__all__ = [
+    "OutlineParser",
+    "PageFetcher",
+    "PageOutline",
+    "TokenScan",
+    "TokenScanner",
+    "get_page_fetcher",
+    "get_token_scanner",
+    "naver_post_view_url",
+    "page_decoder",
+    "parse_postdate",
+    "site_key",
+]
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import re
+from typing import Callable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import current_timings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|:\w+|\?")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUE_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape with literals and bound values reduced to ``?``.
+
+    ``IN`` lists and multi-row ``VALUES`` collapse to one ``(?)`` so a
+    batched query keeps the same fingerprint whatever its size.
+    """
+    shape = _STRING.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _VALUE_LIST.sub("(?)", shape)
+    shape = _VALUE_ROWS.sub("(?)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryGuardError(RuntimeError):
+    pass
+
+
+class RepeatedQueryError(QueryGuardError):
+    """One request issued the same statement shape more often than allowed (N+1)."""
+
+
+class QueryBudgetExceeded(QueryGuardError):
+    """A request or block issued more statements than its declared budget."""
+
+
+class query_budget:
+    """Upper bound on the statements a route or a block may issue.
+
+    As a decorator on an endpoint it declares the budget of the whole
+    request with its caches cold, dependencies included except for what
+    runs under ``outside_budget`` (authentication); the request is checked
+    as it runs when query debugging is on, and overruns are always counted
+    in ``/metrics``.
+    As a context manager it counts every statement the process issues until
+    the block exits and raises :class:`QueryBudgetExceeded` above the limit,
+    which is what tests assert with.
+    """
+
+    _active: list["query_budget"] = []
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.count = 0
+
+    def __call__(self, func: Callable[..., T]) -> Callable[..., T]:
+        # Only tagged, not wrapped: FastAPI reads the endpoint's own signature.
+        func.query_budget = self.limit
+        return func
+
+    def __enter__(self) -> "query_budget":
+        self.count = 0
+        query_budget._active.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        query_budget._active.remove(self)
+        if exc_type is None and self.count > self.limit:
+            raise QueryBudgetExceeded(f"{self.count} queries issued, budget is {self.limit}")
+
+
+class QueryGuard:
+    """Engine hook that watches each request's statements in query debug mode.
+
+    With ``mode="log"`` repeated shapes and budget overruns are logged once
+    per request; with ``mode="raise"`` the offending statement fails with a
+    :class:`QueryGuardError`, so the request errors out in development and
+    tests. ``mode="off"`` only feeds :class:`query_budget` blocks.
+    """
+
+    def __init__(self, mode: str = "off", repeat_threshold: int = 5) -> None:
+        self.mode = mode
+        self.repeat_threshold = repeat_threshold
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        for budget in query_budget._active:
+            budget.count += 1
+        if self.mode == "off":
+            return
+        timings = current_timings()
+        if timings is None:
+            return
+        shape = fingerprint(statement)
+        seen = timings.statements[shape] = timings.statements.get(shape, 0) + 1
+        if seen == self.repeat_threshold + 1:
+            self._report(RepeatedQueryError(f"same statement issued {seen} times in one request: {shape[:200]}"))
+        budget = timings.budget
+        if budget is not None and timings.budgeted_queries == budget + 1 and not timings.exempt_depth:
+            self._report(QueryBudgetExceeded(f"{timings.budgeted_queries} queries issued, budget is {budget}"))
+
+    def _report(self, error: QueryGuardError) -> None:
+        if self.mode == "raise":
+            raise error
+        logger.warning("query guard: %s", error)
+
+
+__all__ = [
+    "QueryBudgetExceeded",
+    "QueryGuard",
+    "QueryGuardError",
+    "RepeatedQueryError",
+    "fingerprint",
+    "query_budget",
+]
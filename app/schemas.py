@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl, ValidationError, model_validator
 
 from .models import BlogStatus, InvitationStatus
 
@@ -41,6 +41,79 @@ class CurveResponse(BaseModel):
     predict: dict[str, int | str]
 
 
+class RankRefreshResponse(BaseModel):
+    probed: int
+    found: int
+    not_found: int
+    failed: int
+
+
+class VerifyBlogJobPayload(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    blog_id: int
+    post_url: HttpUrl
+    title: Optional[str] = None
+    body: Optional[str] = None
+
+
+class CurveRefreshJobPayload(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    keywords: list[str] = Field(default_factory=list)
+
+
+class RankRefreshJobPayload(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+JOB_PAYLOAD_MODELS: dict[str, type[BaseModel]] = {
+    "verify_blog": VerifyBlogJobPayload,
+    "curve_refresh": CurveRefreshJobPayload,
+    "rank_refresh": RankRefreshJobPayload,
+}
+
+
+def validate_job_payload(kind: str, payload: dict) -> dict:
+    """Checked and normalized ``payload`` for ``kind``; raises ``ValueError`` naming the bad keys."""
+    model = JOB_PAYLOAD_MODELS.get(kind)
+    if model is None:
+        return payload
+    try:
+        checked = model.model_validate(payload)
+    except ValidationError as exc:
+        problems = "; ".join(
+            f"payload.{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+        )
+        raise ValueError(f"{kind} 작업의 payload가 올바르지 않습니다 ({problems})") from None
+    return checked.model_dump(mode="json", exclude_none=True)
+
+
+class JobCreateRequest(BaseModel):
+    kind: Literal["verify_blog", "curve_refresh", "rank_refresh"]
+    payload: dict = Field(default_factory=dict)
+
+    @model_validator(mode="after")
+    def _check_payload(self) -> "JobCreateRequest":
+        # Bad payloads are rejected with a 422 here instead of failing inside a worker.
+        self.payload = validate_job_payload(self.kind, self.payload)
+        return self
+
+
+class JobPayload(BaseModel):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    result: Optional[dict] = None
+
+
 class ExternalReferencesRequest(BaseModel):
     keyword: str
     urls: list[HttpUrl]
@@ -185,6 +258,14 @@ __all__ = [
     "Volume",
     "KeywordVolumeResponse",
     "CurveResponse",
+    "RankRefreshResponse",
+    "JOB_PAYLOAD_MODELS",
+    "JobCreateRequest",
+    "JobPayload",
+    "VerifyBlogJobPayload",
+    "CurveRefreshJobPayload",
+    "RankRefreshJobPayload",
+    "validate_job_payload",
     "ExternalReferencesRequest",
     "ExternalReferencesResponse",
     "RefCardExternalPayload",
@@ -1,15 +1,75 @@
 from __future__ import annotations
 
+import hashlib
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
 
 from sqlmodel import select
 
-from ..db import session_scope
-from ..models import User
+from ..db import async_read_scope, async_session_scope
+from ..models import ApiKey, User
+from ..settings import get_settings
+from .versions import API_KEYS, get_data_versions
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class SessionCache:
+    """Bounded TTL map from API key hash to the authenticated user.
+
+    Entries remember the ``API_KEYS`` data version they were cached under and
+    are dropped once it moves, so a key revoked by any process stops working
+    here within ``data_version_check_seconds`` instead of the full TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, int, User]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key_hash: str, version: int = 0) -> User | None:
+        with self._lock:
+            entry = self._entries.get(key_hash)
+            if entry is None:
+                return None
+            expires_at, cached_version, user = entry
+            if expires_at <= time.monotonic() or cached_version != version:
+                del self._entries[key_hash]
+                return None
+            self._entries.move_to_end(key_hash)
+            return user
+
+    def put(self, key_hash: str, user: User, version: int = 0) -> None:
+        with self._lock:
+            self._entries[key_hash] = (time.monotonic() + self.ttl_seconds, version, user)
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key_hash: str) -> None:
+        with self._lock:
+            self._entries.pop(key_hash, None)
+
+
+@lru_cache(maxsize=1)
+def get_session_cache() -> SessionCache:
+    settings = get_settings()
+    return SessionCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)
 
 
 class AuthService:
-    def resolve_user(self, id_token: str | None, dev_user: str | None = None) -> User:
+    def __init__(self) -> None:
+        self.cache = get_session_cache()
+        self.versions = get_data_versions()
+
+    async def resolve_user(self, id_token: str | None, dev_user: str | None = None) -> User:
         email = None
         google_sub = None
         display_name = None
@@ -25,20 +85,24 @@ class AuthService:
         else:
             raise ValueError("id_token or dev_user must be provided")
 
-        with session_scope() as session:
-            user = session.exec(select(User).where(User.email == email)).first()
+        async with async_session_scope() as session:
+            user = (await session.exec(select(User).where(User.email == email))).first()
             if not user:
                 user = User(google_sub=google_sub, email=email, display_name=display_name)
                 session.add(user)
-                session.flush()
+                await session.flush()
             else:
                 user.display_name = display_name or user.display_name
                 user.touch()
                 session.add(user)
         return user
 
-    def issue_session(self, user: User) -> dict:
-        api_key = secrets.token_urlsafe(16)
+    async def issue_session(self, user: User) -> dict:
+        api_key = secrets.token_urlsafe(32)
+        key_hash = hash_api_key(api_key)
+        async with async_session_scope() as session:
+            session.add(ApiKey(user_id=user.id, key_hash=key_hash))
+        self.cache.put(key_hash, user, *await self.versions.current(API_KEYS))
         return {
             "user_id": user.id,
             "email": user.email,
@@ -46,5 +110,41 @@ class AuthService:
             "api_key": api_key,
         }
 
+    async def authenticate(self, api_key: str) -> User | None:
+        key_hash = hash_api_key(api_key)
+        (version,) = await self.versions.current(API_KEYS)
+        user = self.cache.get(key_hash, version)
+        if user is not None:
+            return user
+        async with async_read_scope() as session:
+            user = (
+                await session.exec(
+                    select(User)
+                    .join(ApiKey, ApiKey.user_id == User.id)
+                    .where(ApiKey.key_hash == key_hash, ApiKey.revoked_at.is_(None))
+                )
+            ).first()
+        if user is not None:
+            self.cache.put(key_hash, user, version)
+        return user
+
+    async def revoke(self, api_key: str) -> bool:
+        key_hash = hash_api_key(api_key)
+        self.cache.invalidate(key_hash)
+        async with async_session_scope() as session:
+            record = (await session.exec(select(ApiKey).where(ApiKey.key_hash == key_hash))).first()
+            if not record or record.revoked_at:
+                return False
+            record.revoked_at = datetime.utcnow()
+            record.touch()
+            session.add(record)
+            # Other processes drop their cached sessions once they see the new version.
+            await self.versions.bump(session, API_KEYS)
+        return True
+
+    async def dev_user(self) -> User | None:
+        async with async_read_scope() as session:
+            return (await session.exec(select(User).order_by(User.id.asc()))).first()
+
 
-__all__ = ["AuthService"]
+__all__ = ["AuthService", "SessionCache", "get_session_cache", "hash_api_key"]
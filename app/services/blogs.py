@@ -1,12 +1,12 @@
 from __future__ import annotations
 
+import base64
 from datetime import datetime
 from typing import List
 
-import httpx
-from sqlmodel import select
+from sqlmodel import and_, or_, select
 
-from ..db import session_scope
+from ..db import async_read_scope, async_session_scope
 from ..models import (
     Blog,
     BlogCollaborator,
@@ -14,52 +14,71 @@ from ..models import (
     BlogVerification,
     InvitationStatus,
 )
+from ..providers.web import get_token_scanner
 from ..schemas import BlogPayload, CollaboratorPayload
 from ..settings import get_settings
 from ..utils.tokens import generate_token
+from .versions import blogs_key, collaborators_key, get_data_versions
+
+
+class VerificationFetchError(RuntimeError):
+    """The post could not be read, so its tokens were never checked."""
 
 
 class BlogService:
     def __init__(self) -> None:
         self.settings = get_settings()
-
-    def list_blogs(self, user_id: int) -> List[BlogPayload]:
-        with session_scope() as session:
-            blogs = session.exec(
-                select(Blog)
-                .where(Blog.owner_user_id == user_id)
-                .order_by(Blog.created_at.desc())
-            ).all()
-            payloads: List[BlogPayload] = []
-            for blog in blogs:
-                verification = session.exec(
-                    select(BlogVerification).where(BlogVerification.blog_id == blog.id)
-                ).first()
-                payloads.append(
-                    BlogPayload(
-                        id=blog.id,
-                        naver_blog_id=blog.naver_blog_id,
-                        title=blog.title,
-                        status=blog.status,
-                        verified_at=blog.verified_at,
-                        title_token=verification.title_token if verification else "",
-                        body_token=verification.body_token if verification else "",
-                    )
-                )
-            return payloads
-
-    def create_blog(self, owner_user_id: int, naver_blog_id: str, title: str | None = None) -> BlogPayload:
-        with session_scope() as session:
+        self.scanner = get_token_scanner()
+        self.versions = get_data_versions()
+
+    async def list_blogs(
+        self, user_id: int, limit: int = 100, cursor: str | None = None
+    ) -> tuple[List[BlogPayload], str | None]:
+        statement = (
+            select(Blog, BlogVerification.title_token, BlogVerification.body_token)
+            .outerjoin(BlogVerification, BlogVerification.blog_id == Blog.id)
+            .where(Blog.owner_user_id == user_id)
+            .order_by(Blog.created_at.desc(), Blog.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            created_at, blog_id = _decode_cursor(cursor)
+            statement = statement.where(
+                or_(Blog.created_at < created_at, and_(Blog.created_at == created_at, Blog.id < blog_id))
+            )
+        async with async_read_scope() as session:
+            rows = (await session.exec(statement)).all()
+        payloads = [
+            BlogPayload(
+                id=blog.id,
+                naver_blog_id=blog.naver_blog_id,
+                title=blog.title,
+                status=blog.status,
+                verified_at=blog.verified_at,
+                title_token=title_token or "",
+                body_token=body_token or "",
+            )
+            for blog, title_token, body_token in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last_blog = rows[limit - 1][0]
+            next_cursor = _encode_cursor(last_blog.created_at, last_blog.id)
+        return payloads, next_cursor
+
+    async def create_blog(self, owner_user_id: int, naver_blog_id: str, title: str | None = None) -> BlogPayload:
+        async with async_session_scope() as session:
             blog = Blog(owner_user_id=owner_user_id, naver_blog_id=naver_blog_id, title=title)
             session.add(blog)
-            session.flush()
+            await session.flush()
             verification = BlogVerification(
                 blog_id=blog.id,
                 title_token=generate_token(),
                 body_token=generate_token(),
             )
             session.add(verification)
-            session.flush()
+            await session.flush()
+            await self.versions.bump(session, blogs_key(owner_user_id))
             return BlogPayload(
                 id=blog.id,
                 naver_blog_id=blog.naver_blog_id,
@@ -70,29 +89,45 @@ class BlogService:
                 body_token=verification.body_token,
             )
 
-    def verify_blog(self, blog_id: int, user_id: int, post_url: str, title: str | None, body: str | None) -> tuple[str, str | None]:
-        with session_scope() as session:
-            blog = session.get(Blog, blog_id)
+    async def verify_blog(
+        self,
+        blog_id: int,
+        user_id: int,
+        post_url: str,
+        title: str | None,
+        body: str | None,
+        raise_on_fetch_error: bool = False,
+    ) -> tuple[str, str | None]:
+        async with async_session_scope() as session:
+            blog = await session.get(Blog, blog_id)
             if not blog:
                 return "not_found", "블로그를 찾을 수 없습니다"
             if blog.owner_user_id != user_id:
                 return "forbidden", "소유자만 인증할 수 있습니다"
-            verification = session.exec(
-                select(BlogVerification).where(BlogVerification.blog_id == blog_id)
+            verification = (
+                await session.exec(select(BlogVerification).where(BlogVerification.blog_id == blog_id))
             ).first()
             if not verification:
                 return "not_found", "검증 토큰이 없습니다"
 
-            fetched_title, fetched_body = title, body
-            if (not fetched_title or not fetched_body) and self.settings.dev_allow_http_fetch:
-                fetched_title, fetched_body = self._fetch_blog(post_url)
-            if not fetched_title or not fetched_body:
+            if title and body:
+                title_match = verification.title_token in title
+                body_match = verification.body_token in body
+            elif self.settings.dev_allow_http_fetch:
+                scan = await self.scanner.scan(post_url, [verification.title_token, verification.body_token])
+                if scan.error or not scan.bytes_read:
+                    if raise_on_fetch_error:
+                        raise VerificationFetchError(f"{scan.url}: {scan.error or 'empty response'}")
+                    verification.failed_reason = "제목/본문을 확인할 수 없습니다"
+                    session.add(verification)
+                    return "failed", verification.failed_reason
+                title_match = verification.title_token in scan.found
+                body_match = verification.body_token in scan.found
+            else:
                 verification.failed_reason = "제목/본문을 확인할 수 없습니다"
                 session.add(verification)
                 return "failed", verification.failed_reason
 
-            title_match = verification.title_token in fetched_title
-            body_match = verification.body_token in fetched_body
             if title_match and body_match:
                 blog.status = BlogStatus.VERIFIED
                 blog.verified_at = datetime.utcnow()
@@ -101,15 +136,16 @@ class BlogService:
                 verification.failed_reason = None
                 session.add(blog)
                 session.add(verification)
+                await self.versions.bump(session, blogs_key(user_id))
                 return "verified", None
             else:
                 verification.failed_reason = "토큰이 일치하지 않습니다"
                 session.add(verification)
                 return "failed", verification.failed_reason
 
-    def disown_blog(self, blog_id: int, user_id: int) -> tuple[str, str | None]:
-        with session_scope() as session:
-            blog = session.get(Blog, blog_id)
+    async def disown_blog(self, blog_id: int, user_id: int) -> tuple[str, str | None]:
+        async with async_session_scope() as session:
+            blog = await session.get(Blog, blog_id)
             if not blog:
                 return "not_found", "블로그를 찾을 수 없습니다"
             if blog.owner_user_id != user_id:
@@ -117,16 +153,19 @@ class BlogService:
             blog.status = BlogStatus.DISOWNED
             blog.verified_at = None
             session.add(blog)
-            collaborators = session.exec(select(BlogCollaborator).where(BlogCollaborator.blog_id == blog_id)).all()
+            collaborators = (
+                await session.exec(select(BlogCollaborator).where(BlogCollaborator.blog_id == blog_id))
+            ).all()
             for collab in collaborators:
                 collab.status = InvitationStatus.REVOKED
                 collab.responded_at = datetime.utcnow()
                 session.add(collab)
+            await self.versions.bump(session, blogs_key(user_id), collaborators_key(blog_id))
             return "disowned", None
 
-    def invite_collaborator(self, blog_id: int, owner_id: int, email: str) -> CollaboratorPayload | tuple[str, str | None]:
-        with session_scope() as session:
-            blog = session.get(Blog, blog_id)
+    async def invite_collaborator(self, blog_id: int, owner_id: int, email: str) -> CollaboratorPayload | tuple[str, str | None]:
+        async with async_session_scope() as session:
+            blog = await session.get(Blog, blog_id)
             if not blog:
                 return "not_found", "블로그를 찾을 수 없습니다"
             if blog.owner_user_id != owner_id:
@@ -137,7 +176,8 @@ class BlogService:
                 invited_by_user_id=owner_id,
             )
             session.add(collaborator)
-            session.flush()
+            await session.flush()
+            await self.versions.bump(session, collaborators_key(blog_id))
             return CollaboratorPayload(
                 id=collaborator.id,
                 email=collaborator.invited_email,
@@ -145,22 +185,25 @@ class BlogService:
                 invited_at=collaborator.invited_at,
             )
 
-    def revoke_collaborator(self, blog_id: int, owner_id: int, collab_id: int) -> tuple[str, str | None]:
-        with session_scope() as session:
-            blog = session.get(Blog, blog_id)
+    async def revoke_collaborator(self, blog_id: int, owner_id: int, collab_id: int) -> tuple[str, str | None]:
+        async with async_session_scope() as session:
+            blog = await session.get(Blog, blog_id)
             if not blog or blog.owner_user_id != owner_id:
                 return "forbidden", "권한이 없습니다"
-            collaborator = session.get(BlogCollaborator, collab_id)
+            collaborator = await session.get(BlogCollaborator, collab_id)
             if not collaborator:
                 return "not_found", "협업자를 찾을 수 없습니다"
             collaborator.status = InvitationStatus.REVOKED
             collaborator.responded_at = datetime.utcnow()
             session.add(collaborator)
+            await self.versions.bump(session, collaborators_key(blog_id))
             return "revoked", None
 
-    def list_collaborators(self, blog_id: int) -> List[CollaboratorPayload]:
-        with session_scope() as session:
-            collaborators = session.exec(select(BlogCollaborator).where(BlogCollaborator.blog_id == blog_id)).all()
+    async def list_collaborators(self, blog_id: int) -> List[CollaboratorPayload]:
+        async with async_read_scope() as session:
+            collaborators = (
+                await session.exec(select(BlogCollaborator).where(BlogCollaborator.blog_id == blog_id))
+            ).all()
             return [
                 CollaboratorPayload(
                     id=collab.id,
@@ -171,21 +214,18 @@ class BlogService:
                 for collab in collaborators
             ]
 
-    def _fetch_blog(self, url: str) -> tuple[str | None, str | None]:
-        try:
-            response = httpx.get(url, timeout=5)
-            if response.status_code != 200:
-                return None, None
-            text = response.text
-        except Exception:
-            return None, None
-        # naive parsing: try to extract title/body tokens
-        start_title = text.find("<title>")
-        end_title = text.find("</title>")
-        title = text[start_title + 7 : end_title] if start_title != -1 and end_title != -1 else None
-        body = text
-        return title, body
-
-
-__all__ = ["BlogService"]
+
+def _encode_cursor(created_at: datetime, blog_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{blog_id}".encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, blog_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), int(blog_id)
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("잘못된 커서입니다") from exc
+
+
+__all__ = ["BlogService", "VerificationFetchError"]
 
@@ -1,18 +1,111 @@
 from __future__ import annotations
 
+import asyncio
+from typing import AsyncIterable, AsyncIterator
+
+from ..providers.llm_cache import get_response_cache, normalize_text
 from ..providers.openai import OpenAIProvider, OutlineSection
+from ..settings import get_settings
+
+
+async def assemble_compose(events: AsyncIterable[dict]) -> dict:
+    """Rebuild the ``ComposeResponse`` payload from ``ComposeService.stream`` events."""
+    result: dict = {
+        "titles": [],
+        "overview": "",
+        "checklist": [],
+        "faq": [],
+        "image_suggestions": [],
+        "references": [],
+    }
+    sections: list[dict] = []
+    async for event in events:
+        if event["type"] == "head":
+            result["titles"] = event["titles"]
+            result["overview"] = event["overview"]
+        elif event["type"] == "section":
+            sections.append(event)
+        elif event["type"] == "tail":
+            result["checklist"] = event["checklist"]
+            result["faq"] = event["faq"]
+            result["references"] = event["references"]
+    sections.sort(key=lambda event: event["index"])
+    result["body"] = "\n\n".join(event["body"] for event in sections)
+    result["image_suggestions"] = [event["image_suggestion"] for event in sections]
+    return result
 
 
 class ComposeService:
     def __init__(self) -> None:
         self.llm = OpenAIProvider()
+        self.settings = get_settings()
+        self.response_cache = get_response_cache()
+
+    async def compose(self, draft: str, keyword: str, outline: list[dict], use_cache: bool = True) -> dict:
+        return await assemble_compose(self.stream(draft, keyword, outline, use_cache=use_cache))
+
+    async def stream(
+        self, draft: str, keyword: str, outline: list[dict], use_cache: bool = True
+    ) -> AsyncIterator[dict]:
+        """Replay a cached event stream for identical inputs, otherwise generate and record it."""
+        key = self.response_cache.key(
+            "compose_with_research",
+            {
+                "draft": normalize_text(draft),
+                "keyword": keyword.strip(),
+                "outline": outline,
+                "stub": self.llm.is_stub,
+            },
+        )
+        cached = await self.response_cache.get(key) if use_cache else None
+        if cached is not None:
+            for event in cached:
+                yield event
+            return
+        events: list[dict] = []
+        async for event in self._generate(draft, keyword, outline):
+            events.append(event)
+            yield event
+        await self.response_cache.put(key, events)
+
+    async def _generate(self, draft: str, keyword: str, outline: list[dict]) -> AsyncIterator[dict]:
+        """Yield ``head``, one ``section`` per outline item in outline order, then ``tail``.
+
+        The evidence bundle is collected once while the head is generated; the
+        sections are then generated concurrently (bounded by
+        ``compose_section_concurrency``) and released in order as they finish.
+        """
+        sections = self._sections(outline)
+        evidence_task = asyncio.create_task(self.llm.collect_evidence(keyword, sections))
+        tasks: list[asyncio.Task[dict]] = []
+        try:
+            head = await self.llm.compose_head(draft, keyword, sections)
+            yield {"type": "head", **head}
+
+            evidence = await evidence_task
+            gate = asyncio.Semaphore(self.settings.compose_section_concurrency)
+
+            async def generate(section: OutlineSection) -> dict:
+                async with gate:
+                    return await self.llm.compose_section(draft, keyword, section, evidence.get(section.section_id, []))
+
+            section_tasks = [asyncio.create_task(generate(section)) for section in sections]
+            tail_task = asyncio.create_task(self.llm.compose_tail(keyword, sections))
+            tasks = [*section_tasks, tail_task]
+            for index, (section, task) in enumerate(zip(sections, section_tasks)):
+                yield {"type": "section", "index": index, "section_id": section.section_id, **(await task)}
+
+            references = [reference for section in sections for reference in evidence.get(section.section_id, [])]
+            yield {"type": "tail", **(await tail_task), "references": references}
+        finally:
+            for task in [evidence_task, *tasks]:
+                task.cancel()
 
-    def compose(self, draft: str, keyword: str, outline: list[dict]) -> dict:
-        sections = [
+    def _sections(self, outline: list[dict]) -> list[OutlineSection]:
+        return [
             OutlineSection(section_id=item["section_id"], title=item["title"], bullets=item.get("bullets", []))
             for item in outline
         ]
-        return self.llm.compose_with_research(draft, keyword, sections)
 
 
-__all__ = ["ComposeService"]
+__all__ = ["ComposeService", "assemble_compose"]
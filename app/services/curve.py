@@ -1,68 +1,141 @@
 from __future__ import annotations
 
+import asyncio
 import json
-import math
+import time
 from datetime import datetime
+from functools import lru_cache
 from typing import Iterable, Tuple
 
-from sqlmodel import select
+import numpy as np
+from sqlmodel import and_, func, select
 
-from ..db import session_scope
-from ..models import CurveModel, KeywordVolume
-from ..providers.naver import NaverSearchProvider
+from ..db import async_read_scope, async_session_scope
+from ..models import CurveModel, KeywordVolume, RankLatest
+from ..settings import get_settings
+from .curve_fit import CompiledCurve, fit_rank_curve, is_curve_table
+from .versions import CURVE, get_data_versions
+from .volume_cache import get_volume_cache
+
+
+class CurveCache:
+    """Process-level holder of the compiled curve.
+
+    Reads are served from memory. The newest ``(id, updated_at)`` is compared
+    with the cached version at most once per ``check_interval`` seconds, and
+    right away once the ``CURVE`` data version moves, so a body rendered for a
+    curve ETag never comes from the curve before it. ``params_json`` is only
+    parsed again when a refit happened elsewhere.
+    """
+
+    def __init__(self, check_interval: float) -> None:
+        self.check_interval = check_interval
+        self._curve: CompiledCurve | None = None
+        self._checked_at = 0.0
+        self._version: int | None = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> CompiledCurve | None:
+        (version,) = await get_data_versions().current(CURVE)
+        curve = self._curve
+        if (
+            curve is not None
+            and version == self._version
+            and time.monotonic() - self._checked_at < self.check_interval
+        ):
+            return curve
+        async with self._lock:
+            async with async_read_scope() as session:
+                latest = (
+                    await session.exec(
+                        select(CurveModel.id, CurveModel.updated_at).order_by(CurveModel.updated_at.desc()).limit(1)
+                    )
+                ).first()
+                if latest is None:
+                    self._curve = None
+                elif self._curve is None or (self._curve.model_id, self._curve.updated_at) != tuple(latest):
+                    params_json = (
+                        await session.exec(select(CurveModel.params_json).where(CurveModel.id == latest[0]))
+                    ).one()
+                    params = json.loads(params_json)
+                    self._curve = (
+                        CompiledCurve.from_params(latest[0], latest[1], params) if is_curve_table(params) else None
+                    )
+            # The refit and its version bump commit together, so the rows read here are at least this new.
+            self._version = version
+            self._checked_at = time.monotonic()
+            return self._curve
+
+    def install(self, curve: CompiledCurve) -> None:
+        self._curve = curve
+        # The bump of this refit is read on the next get, which then confirms the row once.
+        self._version = None
+        self._checked_at = time.monotonic()
+
+
+@lru_cache(maxsize=1)
+def get_curve_cache() -> CurveCache:
+    return CurveCache(get_settings().curve_cache_check_seconds)
 
 
 class CurveService:
     def __init__(self) -> None:
-        self.naver = NaverSearchProvider()
+        self.cache = get_curve_cache()
+        self.volume_cache = get_volume_cache()
 
-    def refresh_and_predict(
+    async def refresh_and_predict(
         self, keywords: Iterable[str] | None = None, force_refresh: bool = False
-    ) -> Tuple[CurveModel, dict, dict[str, int | str]]:
+    ) -> Tuple[CompiledCurve, dict[str, int | str]]:
         keywords = list(keywords or [])
-        with session_scope() as session:
-            model = session.exec(select(CurveModel).order_by(CurveModel.updated_at.desc())).first()
-            if not model or force_refresh:
-                params = self._train_parameters(session)
-                payload = json.dumps(params)
-                if not model:
-                    model = CurveModel(params_json=payload)
-                    session.add(model)
-                    session.flush()
-                else:
-                    model.params_json = payload
-                    model.updated_at = datetime.utcnow()
-                    session.add(model)
-                    session.flush()
-            params = json.loads(model.params_json)
-            predictions: dict[str, int | str] = {}
-            for keyword in keywords:
-                volume_info = self.naver.monthly_search_volume(keyword)
-                rank = self._predict_rank(volume_info["total"], params)
-                predictions[keyword] = rank
-        return model, params, predictions
-
-    def _train_parameters(self, session) -> dict:
-        volumes = [kv.volume_total for kv in session.exec(select(KeywordVolume)).all()]
-        if not volumes:
-            pivot = 5000
-            steepness = 0.0015
-            scale = 900
-        else:
-            pivot = sum(volumes) / len(volumes)
-            steepness = 0.002
-            scale = 800
-        return {"pivot": pivot, "steepness": steepness, "scale": scale}
-
-    def _predict_rank(self, volume: int, params: dict) -> int | str:
-        scale = params.get("scale", 800)
-        steepness = params.get("steepness", 0.0015)
-        pivot = params.get("pivot", 5000)
-        exponent = -steepness * (volume - pivot)
-        rank = 1 + int(scale / (1 + math.exp(exponent)))
-        if rank > 1000:
-            return "1000+"
-        return max(1, rank)
-
-
-__all__ = ["CurveService"]
+        curve = None if force_refresh else await self.cache.get()
+        if curve is None:
+            curve = await self._refit()
+            self.cache.install(curve)
+        resolved = await self.volume_cache.get_many(keywords)
+        volumes = [resolved[keyword]["total"] for keyword in keywords]
+        predictions: dict[str, int | str] = dict(zip(keywords, curve.predict_many(volumes)))
+        return curve, predictions
+
+    async def _refit(self) -> CompiledCurve:
+        async with async_session_scope() as session:
+            params = await self._train_parameters(session)
+            payload = json.dumps(params)
+            model = (await session.exec(select(CurveModel).order_by(CurveModel.updated_at.desc()))).first()
+            if not model:
+                model = CurveModel(params_json=payload)
+            else:
+                model.params_json = payload
+                model.updated_at = datetime.utcnow()
+            session.add(model)
+            await session.flush()
+            await get_data_versions().bump(session, CURVE)
+            return CompiledCurve.from_params(model.id, model.updated_at, params)
+
+    async def _train_parameters(self, session) -> dict:
+        await self._backfill_volumes(session)
+        latest = (
+            select(KeywordVolume.keyword, func.max(KeywordVolume.month).label("month"))
+            .group_by(KeywordVolume.keyword)
+            .subquery()
+        )
+        # One sample per probed (post, keyword): its current rank, however long its history is.
+        rows = await session.exec(
+            select(KeywordVolume.volume_total, RankLatest.rank)
+            .join(latest, and_(latest.c.keyword == KeywordVolume.keyword, latest.c.month == KeywordVolume.month))
+            .join(RankLatest, RankLatest.keyword == KeywordVolume.keyword)
+        )
+        samples = np.array(rows.all(), dtype=float).reshape(-1, 2)
+        return fit_rank_curve(samples[:, 0], samples[:, 1])
+
+    async def _backfill_volumes(self, session) -> None:
+        # Probed keywords without any stored volume would silently drop out of the join.
+        unmatched = await session.exec(
+            select(RankLatest.keyword)
+            .distinct()
+            .outerjoin(KeywordVolume, KeywordVolume.keyword == RankLatest.keyword)
+            .where(KeywordVolume.id.is_(None))
+        )
+        await self.volume_cache.get_many(unmatched.all(), session=session)
+
+
+__all__ = ["CurveService", "CurveCache", "get_curve_cache"]
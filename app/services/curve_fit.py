@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Sequence
+
+import numpy as np
+
+from ..providers.naver import NOT_FOUND_RANK, SEARCH_TOP_N
+
+CURVE_KIND = "quantile_bin_median"
+DEFAULT_BINS = 12
+MIN_TRAINING_ROWS = 20
+CENSORED_WEIGHT = 0.25
+
+# Legacy sigmoid used as a prior until enough RankHistory has been collected.
+_PRIOR_PIVOT = 5000.0
+_PRIOR_STEEPNESS = 0.0015
+_PRIOR_SCALE = 900.0
+
+
+def fit_rank_curve(
+    volumes: Sequence[float] | np.ndarray,
+    ranks: Sequence[float] | np.ndarray,
+    n_bins: int = DEFAULT_BINS,
+    censored_weight: float = CENSORED_WEIGHT,
+) -> dict:
+    """Fit a monotone V -> R table from quantile bins of ``log1p(V)``.
+
+    Each bin stores the weighted median rank, where rows outside the Top1000
+    (R=1001) only count with ``censored_weight``. Bin medians are then made
+    non-decreasing with weighted pool-adjacent-violators.
+    """
+    v = np.asarray(volumes, dtype=float)
+    r = np.asarray(ranks, dtype=float)
+    if v.size < MIN_TRAINING_ROWS:
+        return prior_curve()
+
+    x = np.log1p(np.clip(v, 0, None))
+    r = np.clip(np.rint(r), 1, NOT_FOUND_RANK)
+    censored = r >= NOT_FOUND_RANK
+    w = np.where(censored, censored_weight, 1.0)
+
+    edges = np.unique(np.quantile(x, np.linspace(0.0, 1.0, n_bins + 1)))
+    if edges.size < 2:
+        edges = np.array([x[0], x[0]])
+    bins = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, edges.size - 2)
+
+    # Ranks are bounded integers, so one packed key sorts by (bin, rank) at once.
+    order = np.argsort(bins.astype(np.int64) * (NOT_FOUND_RANK + 1) + r.astype(np.int64))
+    sorted_bins, sorted_r, sorted_w = bins[order], r[order], w[order]
+    cumulative = np.cumsum(sorted_w)
+    bin_ids, first = np.unique(sorted_bins, return_index=True)
+    totals = np.add.reduceat(sorted_w, first)
+    halfway = cumulative[first] - sorted_w[first] + totals / 2.0
+    medians = sorted_r[np.searchsorted(cumulative, halfway, side="left")]
+
+    weight_sums = np.bincount(bins, weights=w)[bin_ids]
+    centers = np.bincount(bins, weights=x * w)[bin_ids] / weight_sums
+    counts = np.bincount(bins)[bin_ids]
+    censored_counts = np.bincount(bins, weights=censored)[bin_ids]
+
+    return {
+        "kind": CURVE_KIND,
+        "x": centers.round(6).tolist(),
+        "rank": _monotone(medians, totals).round(3).tolist(),
+        "edges": edges.round(6).tolist(),
+        "counts": counts.astype(int).tolist(),
+        "censored": censored_counts.astype(int).tolist(),
+        "n_rows": int(v.size),
+        "censored_weight": censored_weight,
+    }
+
+
+def prior_curve(n_points: int = DEFAULT_BINS) -> dict:
+    volumes = np.geomspace(10, 200_000, n_points)
+    ranks = 1 + _PRIOR_SCALE / (1 + np.exp(-_PRIOR_STEEPNESS * (volumes - _PRIOR_PIVOT)))
+    x = np.log1p(volumes)
+    return {
+        "kind": CURVE_KIND,
+        "x": x.round(6).tolist(),
+        "rank": ranks.round(3).tolist(),
+        "edges": x.round(6).tolist(),
+        "counts": [0] * n_points,
+        "censored": [0] * n_points,
+        "n_rows": 0,
+        "censored_weight": CENSORED_WEIGHT,
+    }
+
+
+def is_curve_table(params: dict) -> bool:
+    return params.get("kind") == CURVE_KIND and bool(params.get("x")) and bool(params.get("rank"))
+
+
+@dataclass(frozen=True)
+class CompiledCurve:
+    """Bin table of a stored CurveModel, unpacked into arrays for prediction."""
+
+    model_id: int
+    updated_at: datetime
+    params: dict
+    x: np.ndarray
+    rank: np.ndarray
+
+    @classmethod
+    def from_params(cls, model_id: int, updated_at: datetime, params: dict) -> "CompiledCurve":
+        return cls(
+            model_id=model_id,
+            updated_at=updated_at,
+            params=params,
+            x=np.asarray(params["x"], dtype=float),
+            rank=np.asarray(params["rank"], dtype=float),
+        )
+
+    def predict_many(self, volumes: Sequence[float] | np.ndarray) -> list[int | str]:
+        v = np.clip(np.asarray(volumes, dtype=float), 0, None)
+        ranks = np.maximum(np.rint(np.interp(np.log1p(v), self.x, self.rank)).astype(int), 1)
+        return [rank if rank <= SEARCH_TOP_N else "1000+" for rank in ranks.tolist()]
+
+    def predict(self, volume: float) -> int | str:
+        return self.predict_many([volume])[0]
+
+
+def _monotone(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    # Pool-adjacent-violators for a non-decreasing fit; bins are few, rows are not.
+    blocks: list[list[float]] = []
+    for value, weight in zip(values.tolist(), weights.tolist()):
+        blocks.append([value, weight, 1])
+        while len(blocks) > 1 and blocks[-2][0] > blocks[-1][0]:
+            value_b, weight_b, size_b = blocks.pop()
+            value_a, weight_a, size_a = blocks.pop()
+            total = weight_a + weight_b
+            blocks.append([(value_a * weight_a + value_b * weight_b) / total, total, size_a + size_b])
+    return np.concatenate([np.full(size, value) for value, _, size in blocks])
+
+
+__all__ = ["CURVE_KIND", "CompiledCurve", "fit_rank_curve", "prior_curve", "is_curve_table"]
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from sqlmodel import insert, select
+
+from ..db import async_read_scope, async_session_scope, dispose_engines, init_db
+from ..models import Blog, Post, RefCardMyBlog
+from ..settings import get_settings
+from .keyword_index import KeywordIndex, get_keyword_indexes
+from .versions import MY_BLOG, get_data_versions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CARD_SUMMARY = "내원 환자 케이스 기반 톤"
+
+
+def iter_rows(path: Path) -> Iterator[dict]:
+    """Stream rows from a CSV (header row) or JSONL file without loading it whole."""
+    with path.open(encoding="utf-8-sig", newline="") as fp:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(fp)
+
+
+def extract_main_keywords(texts: list[str]) -> list[str | None]:
+    """Best keyword per text; runs in worker processes, so it only uses module-level state."""
+    index = KeywordIndex()
+    keywords: list[str | None] = []
+    for text in texts:
+        ranked = index.rank(text, top_k=3)
+        bigram = next((term for term, _ in ranked if " " in term), None)
+        keywords.append(bigram or (ranked[0][0] if ranked else None))
+    return keywords
+
+
+def _parse_date(value) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _parse_int(value) -> int | None:
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    extracted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "rows_read": self.rows_read,
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "extracted": self.extracted,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+class PostImporter:
+    """Bulk-imports a blog's posts (PRD 4.3 onboarding) together with their RefCardMyBlog rows.
+
+    Rows are read as a stream and written ``batch_size`` at a time: one query
+    to skip URLs the blog already has, one multi-row ``INSERT ... RETURNING``
+    for the posts and one for the cards. Rows without ``main_keyword`` get one
+    extracted from ``title``/``body`` in a process pool of ``workers``.
+    """
+
+    def __init__(self, blog_id: int, batch_size: int = 1000, workers: int = 2) -> None:
+        self.blog_id = blog_id
+        self.batch_size = batch_size
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def import_file(self, path: Path) -> ImportReport:
+        return await self.import_rows(iter_rows(path))
+
+    async def import_rows(self, rows: Iterable[dict]) -> ImportReport:
+        report = ImportReport()
+        started = time.perf_counter()
+        owner_id = await self._owner_id()
+        iterator = iter(rows)
+        try:
+            while batch := list(islice(iterator, self.batch_size)):
+                report.rows_read += len(batch)
+                keywords = await self._import_batch(batch, report)
+                if owner_id is not None:
+                    get_keyword_indexes().add_documents(owner_id, keywords)
+                report.seconds = time.perf_counter() - started
+                logger.info(
+                    "import: blog %s, %d rows read, %d inserted, %.0f rows/s",
+                    self.blog_id,
+                    report.rows_read,
+                    report.inserted,
+                    report.rows_per_second,
+                )
+        finally:
+            if self._pool is not None:
+                pool, self._pool = self._pool, None
+                # Joining the workers blocks, so it happens off the event loop.
+                await asyncio.get_running_loop().run_in_executor(None, partial(pool.shutdown, cancel_futures=True))
+        report.seconds = time.perf_counter() - started
+        return report
+
+    async def _import_batch(self, batch: list[dict], report: ImportReport) -> list[str]:
+        urls = [(row.get("url") or "").strip() for row in batch]
+        async with async_read_scope() as session:
+            existing = set(
+                (
+                    await session.exec(
+                        select(Post.url).where(Post.blog_id == self.blog_id, Post.url.in_([url for url in urls if url]))
+                    )
+                ).all()
+            )
+        fresh: list[dict] = []
+        seen: set[str] = set()
+        for url, row in zip(urls, batch):
+            if not url or url in existing or url in seen:
+                report.skipped += 1
+                continue
+            seen.add(url)
+            fresh.append({**row, "url": url})
+        if not fresh:
+            return []
+        await self._fill_keywords(fresh, report)
+
+        now = datetime.utcnow()
+        post_rows = [
+            {
+                "blog_id": self.blog_id,
+                "url": row["url"],
+                "main_keyword": row.get("main_keyword") or None,
+                "published_at": _parse_date(row.get("published_at")),
+                "expected_rank_at_publish": _parse_int(row.get("expected_rank_at_publish")),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for row in fresh
+        ]
+        async with async_session_scope() as session:
+            result = await session.execute(insert(Post).returning(Post.id, sort_by_parameter_order=True), post_rows)
+            post_ids = result.scalars().all()
+            card_rows = [
+                {
+                    "post_id": post_id,
+                    "url": row["url"],
+                    "title": row.get("title") or f"{row.get('main_keyword') or ''} 경험담".strip(),
+                    "summary": row.get("summary") or DEFAULT_CARD_SUMMARY,
+                    "postdate": str(row["published_at"]) if row.get("published_at") else None,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for post_id, row in zip(post_ids, fresh)
+            ]
+            await session.execute(insert(RefCardMyBlog), card_rows)
+            await get_data_versions().bump(session, MY_BLOG)
+        report.inserted += len(post_rows)
+        return [row["main_keyword"] for row in post_rows if row["main_keyword"]]
+
+    async def _fill_keywords(self, rows: list[dict], report: ImportReport) -> None:
+        missing = [row for row in rows if not row.get("main_keyword") and (row.get("title") or row.get("body"))]
+        if not missing:
+            return
+        if self._pool is None:
+            # Forked workers would inherit the event loop, its threads and open DB connections.
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        texts = [f"{row.get('title') or ''}\n{row.get('body') or ''}" for row in missing]
+        size = max(1, -(-len(texts) // self.workers))
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(
+            *(
+                loop.run_in_executor(self._pool, extract_main_keywords, texts[start : start + size])
+                for start in range(0, len(texts), size)
+            )
+        )
+        for row, keyword in zip(missing, (keyword for chunk in chunks for keyword in chunk)):
+            row["main_keyword"] = keyword
+            report.extracted += keyword is not None
+
+    async def _owner_id(self) -> int | None:
+        async with async_read_scope() as session:
+            blog = await session.get(Blog, self.blog_id)
+            return blog.owner_user_id if blog else None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Import a blog's posts from CSV or JSONL.")
+    parser.add_argument("blog_id", type=int)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    settings = get_settings()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    init_db()
+    importer = PostImporter(
+        args.blog_id,
+        batch_size=args.batch_size or settings.import_batch_size,
+        workers=args.workers or settings.import_workers,
+    )
+
+    async def run() -> ImportReport:
+        try:
+            return await importer.import_file(args.path)
+        finally:
+            await dispose_engines()
+
+    print(json.dumps(asyncio.run(run()).as_dict()))
+
+
+__all__ = ["ImportReport", "PostImporter", "extract_main_keywords", "iter_rows"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import func, select, update
+
+from ..db import async_read_scope, async_session_scope
+from ..models import Job, JobStatus
+from ..schemas import validate_job_payload
+from ..settings import get_settings
+from .blogs import BlogService, VerificationFetchError
+from .curve import CurveService
+from .ranks import RankService
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[int | None, dict], Awaitable[dict]]
+
+
+class RetryableJobError(RuntimeError):
+    """Raised by a handler whose outside call failed, so the attempt is retried with backoff."""
+
+
+async def _verify_blog(user_id: int | None, payload: dict) -> dict:
+    try:
+        status, reason = await BlogService().verify_blog(
+            blog_id=int(payload["blog_id"]),
+            user_id=user_id,
+            post_url=str(payload["post_url"]),
+            title=payload.get("title"),
+            body=payload.get("body"),
+            raise_on_fetch_error=True,
+        )
+    except VerificationFetchError as exc:
+        raise RetryableJobError(f"포스트를 읽지 못했습니다 ({exc})") from exc
+    return {"status": status, "reason": reason}
+
+
+async def _refresh_curve(user_id: int | None, payload: dict) -> dict:
+    curve, predictions = await CurveService().refresh_and_predict(payload.get("keywords", []), force_refresh=True)
+    return {"updated_at": curve.updated_at.isoformat(), "predict": predictions}
+
+
+async def _refresh_ranks(user_id: int | None, payload: dict) -> dict:
+    summary = await RankService().refresh_ranks(user_id)
+    if summary["failed"]:
+        # Probes that succeeded are already stored; the retry measures every post again.
+        raise RetryableJobError(f"순위 조회 {summary['failed']}/{summary['probed']}건이 실패했습니다")
+    return summary
+
+
+JOB_HANDLERS: dict[str, JobHandler] = {
+    "verify_blog": _verify_blog,
+    "curve_refresh": _refresh_curve,
+    "rank_refresh": _refresh_ranks,
+}
+
+
+def job_payload(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status.value,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": job.run_after,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "last_error": job.last_error,
+        "result": json.loads(job.result_json) if job.result_json else None,
+    }
+
+
+def dedupe_key(kind: str, user_id: int | None, payload: dict) -> str:
+    material = json.dumps([kind, user_id, payload], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    """Job table drained by a pool of asyncio workers inside the API process.
+
+    Enqueueing a job identical to one that is still pending or running returns
+    the existing row. Workers claim due jobs with a conditional UPDATE, so
+    several workers (or processes sharing the database) never run one job
+    twice. Failed attempts are retried after ``backoff * 2**(attempt-1)``
+    seconds until ``max_attempts`` is reached.
+
+    A running job holds a lease: its worker refreshes ``heartbeat_at`` every
+    quarter of ``lease`` seconds. Only jobs whose lease has run out, because
+    the process running them died, are put back in the queue, so a restart
+    next to live workers does not run their jobs a second time. Heartbeats
+    and results only apply to the claim that made them (same ``attempts``,
+    still running), so a worker that lost its lease cannot overwrite the job
+    another worker has claimed since.
+    """
+
+    def __init__(
+        self,
+        handlers: dict[str, JobHandler],
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+        backoff: float = 2.0,
+        lease: float = 60.0,
+    ) -> None:
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self._wakeup = asyncio.Event()
+        self._enqueue_lock = asyncio.Lock()
+
+    async def enqueue(self, kind: str, payload: dict, user_id: int | None = None) -> Job:
+        if kind not in self.handlers:
+            raise ValueError("알 수 없는 작업입니다")
+        payload = validate_job_payload(kind, payload)
+        key = dedupe_key(kind, user_id, payload)
+        async with self._enqueue_lock, async_session_scope() as session:
+            job = (
+                await session.exec(
+                    select(Job).where(
+                        Job.dedupe_key == key,
+                        Job.status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+                    )
+                )
+            ).first()
+            if job is None:
+                job = Job(
+                    user_id=user_id,
+                    kind=kind,
+                    payload_json=json.dumps(payload, ensure_ascii=False),
+                    dedupe_key=key,
+                    max_attempts=self.max_attempts,
+                )
+                session.add(job)
+                await session.flush()
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: int) -> Job | None:
+        async with async_read_scope() as session:
+            return await session.get(Job, job_id)
+
+    def start(self) -> list[asyncio.Task]:
+        # Bind the primitives to the loop the workers run on.
+        self._wakeup = asyncio.Event()
+        self._enqueue_lock = asyncio.Lock()
+        workers = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        return [*workers, asyncio.create_task(self.requeue_periodically(self.lease))]
+
+    async def requeue_interrupted(self) -> int:
+        """Return ``running`` jobs whose lease expired to the queue."""
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.lease)
+        async with async_session_scope() as session:
+            result = await session.execute(
+                update(Job)
+                .where(Job.status == JobStatus.RUNNING, func.coalesce(Job.heartbeat_at, Job.started_at) < cutoff)
+                .values(status=JobStatus.PENDING, heartbeat_at=None, updated_at=now)
+            )
+            return result.rowcount or 0
+
+    async def requeue_periodically(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                requeued = await self.requeue_interrupted()
+                if requeued:
+                    logger.info("jobs: requeued %d jobs with an expired lease", requeued)
+                    self._wakeup.set()
+            except SQLAlchemyError:
+                logger.exception("jobs: requeueing expired jobs failed")
+
+    async def run_once(self) -> bool:
+        """Claim and run one due job; returns False when nothing was due."""
+        job = await self._claim()
+        if job is None:
+            return False
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            result = await self.handlers[job.kind](job.user_id, json.loads(job.payload_json))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.exception("jobs: %s #%s failed (attempt %d)", job.kind, job.id, job.attempts)
+            await self._fail(job, f"{type(exc).__name__}: {exc}")
+        else:
+            await self._finish(job, JobStatus.SUCCEEDED, result_json=json.dumps(result, ensure_ascii=False, default=str))
+        finally:
+            heartbeat.cancel()
+        return True
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 4)
+            try:
+                async with async_session_scope() as session:
+                    await session.execute(
+                        update(Job).where(*self._claimed(job)).values(heartbeat_at=datetime.utcnow())
+                    )
+            except SQLAlchemyError:
+                logger.exception("jobs: heartbeat of #%s failed", job.id)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                ran = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("jobs: worker iteration failed")
+                ran = False
+            if ran:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self) -> Job | None:
+        now = datetime.utcnow()
+        async with async_session_scope() as session:
+            candidates = (
+                await session.exec(
+                    select(Job.id)
+                    .where(Job.status == JobStatus.PENDING, Job.run_after <= now)
+                    .order_by(Job.run_after, Job.id)
+                    .limit(self.concurrency)
+                )
+            ).all()
+            for job_id in candidates:
+                result = await session.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JobStatus.PENDING)
+                    .values(
+                        status=JobStatus.RUNNING,
+                        attempts=Job.attempts + 1,
+                        started_at=now,
+                        heartbeat_at=now,
+                        updated_at=now,
+                    )
+                )
+                if result.rowcount:
+                    return await session.get(Job, job_id)
+        return None
+
+    @staticmethod
+    def _claimed(job: Job) -> tuple:
+        # The claim this worker holds: a requeue and a new claim move status or attempts on.
+        return Job.id == job.id, Job.status == JobStatus.RUNNING, Job.attempts == job.attempts
+
+    async def _fail(self, job: Job, error: str) -> bool:
+        if job.attempts >= job.max_attempts:
+            return await self._finish(job, JobStatus.FAILED, last_error=error)
+        delay = self.backoff * 2 ** (job.attempts - 1)
+        async with async_session_scope() as session:
+            result = await session.execute(
+                update(Job)
+                .where(*self._claimed(job))
+                .values(
+                    status=JobStatus.PENDING,
+                    run_after=datetime.utcnow() + timedelta(seconds=delay),
+                    last_error=error,
+                    updated_at=datetime.utcnow(),
+                )
+            )
+        return self._still_claimed(job, result.rowcount)
+
+    async def _finish(self, job: Job, status: JobStatus, **values: Any) -> bool:
+        now = datetime.utcnow()
+        async with async_session_scope() as session:
+            result = await session.execute(
+                update(Job).where(*self._claimed(job)).values(status=status, finished_at=now, updated_at=now, **values)
+            )
+        return self._still_claimed(job, result.rowcount)
+
+    @staticmethod
+    def _still_claimed(job: Job, rowcount: int | None) -> bool:
+        if rowcount:
+            return True
+        logger.warning("jobs: %s #%s lost its lease during attempt %d; result dropped", job.kind, job.id, job.attempts)
+        return False
+
+
+@lru_cache(maxsize=1)
+def get_job_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(
+        JOB_HANDLERS,
+        concurrency=settings.job_workers,
+        poll_interval=settings.job_poll_seconds,
+        max_attempts=settings.job_max_attempts,
+        backoff=settings.job_retry_backoff_seconds,
+        lease=settings.job_lease_seconds,
+    )
+
+
+__all__ = ["JOB_HANDLERS", "JobQueue", "RetryableJobError", "dedupe_key", "get_job_queue", "job_payload"]
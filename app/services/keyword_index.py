@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from itertools import chain
+from typing import Iterable, Union
+
+from sqlmodel import func, select
+
+from ..db import async_read_scope, async_session_scope, dialect_insert
+from ..models import Blog, KeywordDraft, KeywordTermCount, Post
+
+# A term is a normalized token or an adjacent (left, right) pair of them.
+Term = Union[str, tuple[str, str]]
+
+_TOKEN = re.compile(r"[0-9a-z가-힣]+")
+_HANGUL_BASE = 0xAC00
+_RIEUL = 8
+# Particles and the stem ending they attach to: True after a final consonant (병원이),
+# False after a vowel (아토피가), None after either. A particle that does not fit the
+# stem is part of the noun (전문가, 평가). 과/나/만 are left out because too many nouns
+# end in them (피부과, 비만).
+_PARTICLES: dict[str, bool | None] = {
+    "으로부터": True,
+    "에서부터": None,
+    "이라도": True,
+    "에게서": None,
+    "한테서": None,
+    "까지는": None,
+    "에서는": None,
+    "에서도": None,
+    "으로는": True,
+    "으로도": True,
+    "이라는": True,
+    "라는": False,
+    "이나": True,
+    "처럼": None,
+    "보다": None,
+    "부터": None,
+    "까지": None,
+    "마저": None,
+    "조차": None,
+    "에서": None,
+    "에게": None,
+    "한테": None,
+    "으로": True,
+    "과는": True,
+    "와는": False,
+    "은": True,
+    "는": False,
+    "이": True,
+    "가": False,
+    "을": True,
+    "를": False,
+    "의": None,
+    "에": None,
+    "도": None,
+    "로": False,
+    "와": False,
+}
+_LONGEST_PARTICLE = max(map(len, _PARTICLES))
+# Nouns whose last syllable fits the stem rule of a particle anyway.
+_PARTICLE_LIKE_NOUNS = frozenset(
+    {"고양이", "어린이", "놀이", "먹이", "높이", "길이", "깊이", "넓이", "민주주의", "제주도", "울릉도"}
+)
+_STOPWORDS = frozenset(
+    {"그리고", "하지만", "그러나", "또한", "그래서", "때문", "경우", "정도", "이번", "오늘", "있습니다", "합니다", "하는", "있는", "없는", "통해", "대한", "위해"}
+)
+BIGRAM_WEIGHT = 1.5
+BIGRAM_MIN_COUNT = 2
+
+
+def _attaches(stem: str, particle: str) -> bool:
+    after_consonant = _PARTICLES[particle]
+    code = ord(stem[-1]) - _HANGUL_BASE
+    if after_consonant is None or not 0 <= code < 11172:
+        return True
+    final = code % 28
+    if particle == "로":
+        # 로 also follows ㄹ (서울로); 으로 covers the other final consonants.
+        return final in (0, _RIEUL)
+    return bool(final) == after_consonant
+
+
+@lru_cache(maxsize=65536)
+def normalize_token(token: str) -> str:
+    if token in _PARTICLE_LIKE_NOUNS:
+        return token
+    # Longest particle first, so "에서는" is not stripped as "는"; stems keep two characters.
+    for cut in range(max(2, len(token) - _LONGEST_PARTICLE), len(token)):
+        particle = token[cut:]
+        if particle in _PARTICLES and _attaches(token[:cut], particle):
+            return token[:cut]
+    return token
+
+
+@lru_cache(maxsize=65536)
+def _terms_of_word(word: str) -> tuple[str, ...]:
+    # Whitespace-separated words repeat heavily within a draft, so the regex
+    # work runs once per distinct word instead of once per occurrence.
+    tokens = (normalize_token(token) for token in _TOKEN.findall(word.lower()))
+    return tuple(token for token in tokens if len(token) >= 2 and token not in _STOPWORDS)
+
+
+@lru_cache(maxsize=65536)
+def _first_term(word: str) -> str:
+    terms = _terms_of_word(word)
+    return terms[0] if terms else ""
+
+
+@lru_cache(maxsize=65536)
+def _last_term(word: str) -> str:
+    terms = _terms_of_word(word)
+    return terms[-1] if terms else ""
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased tokens of at least two characters with trailing Korean particles removed."""
+    return list(chain.from_iterable(map(_terms_of_word, text.split())))
+
+
+def candidate_terms(text: str) -> tuple[Counter[str], Counter[tuple[str, str]]]:
+    """Unigram and adjacent-bigram frequencies of ``text``.
+
+    Words go through memoized per-word lookups and are counted by ``Counter``
+    directly, so the Python-level work is one pass over the distinct word
+    pairs. Bigrams span exactly two neighbouring words, so a stopword or
+    symbol-only word breaks the phrase.
+    """
+    words = text.split()
+    unigrams = Counter(chain.from_iterable(map(_terms_of_word, words)))
+    pairs = Counter(zip(map(_last_term, words), map(_first_term, words[1:])))
+    bigrams = Counter({pair: count for pair, count in pairs.items() if pair[0] and pair[1] and pair[0] != pair[1]})
+    return unigrams, bigrams
+
+
+def document_digest(text: str) -> str:
+    return hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _term_label(term: Term) -> str:
+    return term if isinstance(term, str) else " ".join(term)
+
+
+def _parse_term(label: str) -> Term:
+    left, _, right = label.partition(" ")
+    return (left, right) if right else left
+
+
+class KeywordIndex:
+    """Document frequencies over one user's keyword corpus, updated one document at a time.
+
+    Documents are the user's posts (their ``main_keyword``) plus every
+    distinct draft passed to keyword extraction.
+    """
+
+    def __init__(self) -> None:
+        self.documents = 0
+        self.document_frequency: Counter[Term] = Counter()
+        self._lock = threading.Lock()
+
+    def add_document(self, text: str) -> bool:
+        unigrams, bigrams = candidate_terms(text)
+        if not unigrams:
+            return False
+        self.add_terms(chain(unigrams, bigrams))
+        return True
+
+    def add_terms(self, terms: Iterable[Term]) -> None:
+        """Count one document made of the distinct ``terms``."""
+        with self._lock:
+            self.documents += 1
+            self.document_frequency.update(terms)
+
+    def merge(self, documents: int, frequencies: Iterable[tuple[Term, int]]) -> None:
+        """Add ``documents`` documents whose per-term counts were kept elsewhere."""
+        with self._lock:
+            self.documents += documents
+            for term, count in frequencies:
+                self.document_frequency[term] += count
+
+    def idf(self, term: Term) -> float:
+        return math.log((self.documents + 1) / (self.document_frequency.get(term, 0) + 1)) + 1.0
+
+    def rank(self, text: str, top_k: int = 8) -> list[tuple[str, float]]:
+        """Top ``top_k`` TF-IDF terms of ``text``; bigrams must repeat and are weighted by ``BIGRAM_WEIGHT``."""
+        return self.rank_terms(*candidate_terms(text), top_k=top_k)
+
+    def rank_terms(
+        self, unigrams: Counter[str], bigrams: Counter[tuple[str, str]], top_k: int = 8
+    ) -> list[tuple[str, float]]:
+        # Each counter is visited by descending frequency; a scan stops once even
+        # an unseen term at the current frequency could not enter the top k.
+        best_idf = math.log(self.documents + 1) + 1.0
+        heap: list[tuple[float, str]] = []
+
+        def consider(candidates: Counter, weight: float, min_count: int) -> None:
+            for term, count in candidates.most_common():
+                if count < min_count or (len(heap) == top_k and count * weight * best_idf <= heap[0][0]):
+                    return
+                score = count * weight * self.idf(term)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, (score, _term_label(term)))
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, (score, _term_label(term)))
+
+        consider(unigrams, 1.0, 1)
+        consider(bigrams, BIGRAM_WEIGHT, BIGRAM_MIN_COUNT)
+        ranked = sorted(heap, key=lambda item: (-item[0], item[1]))
+        return [(term, round(score, 4)) for score, term in ranked]
+
+
+class KeywordIndexes:
+    """Per-user ``KeywordIndex`` instances, seeded on first use.
+
+    The seed is one document per post with a ``main_keyword`` plus the
+    draft counts kept in ``KeywordTermCount``, which each newly seen draft
+    updates in place. Seeding reads one row per post and per distinct draft
+    term, never the drafts themselves, and only blocks extraction for the
+    user being seeded. Drafts extracted in another process are picked up the
+    next time this one seeds the user.
+    """
+
+    def __init__(self) -> None:
+        self._indexes: dict[int, KeywordIndex] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    async def for_user(self, user_id: int) -> KeywordIndex:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            return index
+        async with self._locks.setdefault(user_id, asyncio.Lock()):
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = await self._seed(user_id)
+                self._indexes[user_id] = index
+        return index
+
+    async def extract(self, user_id: int, text: str, top_k: int = 8) -> list[tuple[str, float]]:
+        """Rank ``text`` against the user's corpus so far, then count it as a document if it is a new draft."""
+        index = await self.for_user(user_id)
+        unigrams, bigrams = candidate_terms(text)
+        ranked = index.rank_terms(unigrams, bigrams, top_k=top_k)
+        if unigrams and await self._store_draft(user_id, document_digest(text), [*unigrams, *bigrams]):
+            index.add_terms(chain(unigrams, bigrams))
+        return ranked
+
+    def add_documents(self, user_id: int, texts: Iterable[str]) -> None:
+        """Feed new posts' main keywords to an already loaded index; unloaded users read them when seeded."""
+        index = self._indexes.get(user_id)
+        if index is None:
+            return
+        for text in texts:
+            index.add_document(text)
+
+    async def _seed(self, user_id: int) -> KeywordIndex:
+        async with async_read_scope() as session:
+            main_keywords = (
+                await session.exec(
+                    select(Post.main_keyword)
+                    .join(Blog, Blog.id == Post.blog_id)
+                    .where(Blog.owner_user_id == user_id, Post.main_keyword.is_not(None))
+                )
+            ).all()
+            drafts = (
+                await session.exec(select(func.count()).select_from(KeywordDraft).where(KeywordDraft.user_id == user_id))
+            ).one()
+            counts = (
+                await session.exec(
+                    select(KeywordTermCount.term, KeywordTermCount.documents).where(KeywordTermCount.user_id == user_id)
+                )
+            ).all()
+        index = KeywordIndex()
+        # Every post is its own document, however many share a main keyword.
+        for keyword in main_keywords:
+            index.add_document(keyword)
+        index.merge(drafts, ((_parse_term(term), documents) for term, documents in counts))
+        return index
+
+    async def _store_draft(self, user_id: int, digest: str, terms: list[Term]) -> bool:
+        """Record a draft and count its terms; False when this user's draft was counted before."""
+        async with async_session_scope() as session:
+            inserted = await session.execute(
+                dialect_insert(KeywordDraft)
+                .values(user_id=user_id, digest=digest, created_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=["user_id", "digest"])
+            )
+            if not inserted.rowcount:
+                return False
+            stmt = dialect_insert(KeywordTermCount)
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["user_id", "term"], set_={"documents": KeywordTermCount.documents + 1}
+                ),
+                [{"user_id": user_id, "term": _term_label(term), "documents": 1} for term in terms],
+            )
+        return True
+
+
+@lru_cache(maxsize=1)
+def get_keyword_indexes() -> KeywordIndexes:
+    return KeywordIndexes()
+
+
+__all__ = [
+    "KeywordIndex",
+    "KeywordIndexes",
+    "Term",
+    "candidate_terms",
+    "document_digest",
+    "get_keyword_indexes",
+    "normalize_token",
+    "tokenize",
+]
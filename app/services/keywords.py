@@ -2,38 +2,38 @@ from __future__ import annotations
 
 from typing import Iterable
 
-from sqlmodel import select
-
-from ..db import session_scope
-from ..models import KeywordVolume
+from ..providers.llm_cache import get_response_cache, normalize_text
 from ..providers.openai import OpenAIProvider
-from ..providers.naver import NaverSearchProvider
+from .keyword_index import get_keyword_indexes
+from .volume_cache import get_volume_cache
 
 
 class KeywordService:
     def __init__(self) -> None:
         self.llm = OpenAIProvider()
-        self.naver = NaverSearchProvider()
-
-    def extract_candidates(self, draft: str) -> list[dict]:
-        return self.llm.keyword_candidates(draft)
-
-    def volumes(self, keywords: Iterable[str]) -> dict[str, dict]:
-        response: dict[str, dict] = {}
-        with session_scope() as session:
-            for keyword in keywords:
-                volume = self.naver.monthly_search_volume(keyword)
-                record = session.exec(
-                    select(KeywordVolume)
-                    .where(KeywordVolume.keyword == keyword, KeywordVolume.month == volume["month"])
-                    .limit(1)
-                ).first()
-                if not record:
-                    record = KeywordVolume(keyword=keyword, month=volume["month"], volume_total=volume["total"])
-                    session.add(record)
-                    session.flush()
-                response[keyword] = {"month": record.month, "total": record.volume_total}
-        return response
+        self.volume_cache = get_volume_cache()
+        self.response_cache = get_response_cache()
+        self.indexes = get_keyword_indexes()
+
+    async def extract_candidates(self, user_id: int, draft: str, use_cache: bool = True) -> list[dict]:
+        async def compute() -> list[dict]:
+            ranked = await self.indexes.extract(user_id, draft)
+            return await self.llm.keyword_candidates(draft, [term for term, _ in ranked])
+
+        return await self.response_cache.get_or_compute(
+            "keyword_candidates",
+            {
+                "user_id": user_id,
+                "draft": normalize_text(draft),
+                "stub": self.llm.is_stub,
+                "sample": self.llm.settings.dev_sample_candidates,
+            },
+            compute,
+            use_cache=use_cache,
+        )
+
+    async def volumes(self, keywords: Iterable[str]) -> dict[str, dict]:
+        return await self.volume_cache.get_many(keywords)
 
 
 __all__ = ["KeywordService"]
@@ -1,14 +1,40 @@
 from __future__ import annotations
 
+from ..providers.llm_cache import get_response_cache, normalize_text
 from ..providers.openai import OpenAIProvider
 
 
 class OutlineService:
     def __init__(self) -> None:
         self.llm = OpenAIProvider()
+        self.response_cache = get_response_cache()
 
-    def create_outline(self, draft: str, keyword: str, volume: int | None, selected_refs: list[dict]) -> tuple[list[dict], list[dict]]:
-        sections, evidence = self.llm.build_outline(draft, keyword, volume, selected_refs)
+    async def create_outline(
+        self,
+        draft: str,
+        keyword: str,
+        volume: int | None,
+        selected_refs: list[dict],
+        use_cache: bool = True,
+    ) -> tuple[list[dict], list[dict]]:
+        outline_payload, evidence_payload = await self.response_cache.get_or_compute(
+            "build_outline",
+            {
+                "draft": normalize_text(draft),
+                "keyword": keyword.strip(),
+                "volume": volume,
+                "refs": selected_refs,
+                "stub": self.llm.is_stub,
+            },
+            lambda: self._build_outline(draft, keyword, volume, selected_refs),
+            use_cache=use_cache,
+        )
+        return outline_payload, evidence_payload
+
+    async def _build_outline(
+        self, draft: str, keyword: str, volume: int | None, selected_refs: list[dict]
+    ) -> list[list[dict]]:
+        sections, evidence = await self.llm.build_outline(draft, keyword, volume, selected_refs)
         outline_payload = [
             {"section_id": section.section_id, "title": section.title, "bullets": section.bullets}
             for section in sections
@@ -22,7 +48,7 @@ class OutlineService:
             }
             for item in evidence
         ]
-        return outline_payload, evidence_payload
+        return [outline_payload, evidence_payload]
 
 
 __all__ = ["OutlineService"]
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import case, func, literal
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import delete, insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..db import async_session_scope, dialect_insert
+from ..models import Blog, Post, PostImprovement, RankHistory, RankLatest, RankRollup
+from ..providers.naver import SEARCH_TOP_N
+from ..settings import get_settings
+from .versions import MY_BLOG, get_data_versions
+
+logger = logging.getLogger(__name__)
+
+PERIOD_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+_PG_PERIOD_FORMATS = {"day": "YYYY-MM-DD", "month": "YYYY-MM"}
+_ROLLUP_COLUMNS = ["post_id", "keyword", "period", "bucket", "samples", "rank_sum", "rank_min", "rank_max", "found"]
+
+
+def latest_rows(rows: Iterable[dict]) -> list[dict]:
+    """Newest row per (post, keyword) in RankLatest's shape."""
+    latest: dict[tuple[int, str], dict] = {}
+    for row in rows:
+        key = (row["post_id"], row["keyword"])
+        current = latest.get(key)
+        if current is None or row["measured_at"] >= current["measured_at"]:
+            latest[key] = {
+                "post_id": row["post_id"],
+                "keyword": row["keyword"],
+                "rank": row["rank"],
+                "measured_at": row["measured_at"],
+                "mode": row.get("mode", "sim"),
+            }
+    return list(latest.values())
+
+
+def rollup_rows(rows: Iterable[dict]) -> list[dict]:
+    """One RankRollup row per (post, keyword, period, bucket) touched by ``rows``."""
+    rollups: dict[tuple[int, str, str, str], dict] = {}
+    for row in rows:
+        rank = row["rank"]
+        found = int(rank <= SEARCH_TOP_N)
+        for period, fmt in PERIOD_FORMATS.items():
+            key = (row["post_id"], row["keyword"], period, row["measured_at"].strftime(fmt))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollups[key] = dict(zip(_ROLLUP_COLUMNS, (*key, 1, rank, rank, rank, found)))
+                continue
+            rollup["samples"] += 1
+            rollup["rank_sum"] += rank
+            rollup["rank_min"] = min(rollup["rank_min"], rank)
+            rollup["rank_max"] = max(rollup["rank_max"], rank)
+            rollup["found"] += found
+    return list(rollups.values())
+
+
+def _upsert_latest():
+    stmt = dialect_insert(RankLatest)
+    return stmt.on_conflict_do_update(
+        index_elements=["post_id", "keyword"],
+        set_={"rank": stmt.excluded.rank, "measured_at": stmt.excluded.measured_at, "mode": stmt.excluded.mode},
+        where=RankLatest.measured_at <= stmt.excluded.measured_at,
+    )
+
+
+def _upsert_rollups():
+    stmt = dialect_insert(RankRollup)
+    new = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["post_id", "keyword", "period", "bucket"],
+        set_={
+            "samples": RankRollup.samples + new.samples,
+            "rank_sum": RankRollup.rank_sum + new.rank_sum,
+            "rank_min": case((new.rank_min < RankRollup.rank_min, new.rank_min), else_=RankRollup.rank_min),
+            "rank_max": case((new.rank_max > RankRollup.rank_max, new.rank_max), else_=RankRollup.rank_max),
+            "found": RankRollup.found + new.found,
+        },
+    )
+
+
+def _refresh_improvements(post_ids: Iterable[int] | None = None):
+    """Recompute PostImprovement from RankLatest, for ``post_ids`` or every post."""
+    source = (
+        select(
+            Post.id,
+            Blog.owner_user_id,
+            RankLatest.keyword,
+            Post.expected_rank_at_publish,
+            RankLatest.rank,
+            Post.expected_rank_at_publish - RankLatest.rank,
+            RankLatest.measured_at,
+        )
+        .join(Blog, Blog.id == Post.blog_id)
+        .join(RankLatest, (RankLatest.post_id == Post.id) & (RankLatest.keyword == Post.main_keyword))
+        .where(Post.expected_rank_at_publish.is_not(None))
+    )
+    if post_ids is not None:
+        source = source.where(Post.id.in_(sorted(set(post_ids))))
+    stmt = dialect_insert(PostImprovement).from_select(
+        ["post_id", "owner_user_id", "keyword", "expected_rank", "latest_rank", "improvement", "measured_at"],
+        source,
+    )
+    new = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["post_id"],
+        set_={
+            "owner_user_id": new.owner_user_id,
+            "keyword": new.keyword,
+            "expected_rank": new.expected_rank,
+            "latest_rank": new.latest_rank,
+            "improvement": new.improvement,
+            "measured_at": new.measured_at,
+        },
+    )
+
+
+def _bucket(column, period: str, dialect: str):
+    if dialect == "postgresql":
+        return func.to_char(column, _PG_PERIOD_FORMATS[period])
+    return func.strftime(PERIOD_FORMATS[period], column)
+
+
+class RankSeries:
+    """RankHistory as a time series with the tables derived from it.
+
+    Every write appends the raw rows and, in the same transaction, upserts
+    RankLatest (newest rank per post and keyword), the daily and monthly
+    RankRollup rows and the PostImprovement scores of the posts it touched,
+    so readers never aggregate raw history. Compaction then
+    drops raw rows past ``rank_raw_retention_days`` and daily rollups past
+    ``rank_daily_retention_days``; what they held lives on in the coarser
+    rollups.
+    """
+
+    def __init__(self) -> None:
+        self.settings = get_settings()
+
+    async def record(self, rows: list[dict], session: AsyncSession | None = None) -> None:
+        """Append RankHistory rows (``post_id``, ``keyword``, ``rank``, ``measured_at``, ``mode``)."""
+        if not rows:
+            return
+        if session is None:
+            async with async_session_scope() as scoped:
+                await self._record(scoped, rows)
+        else:
+            await self._record(session, rows)
+
+    async def _record(self, session: AsyncSession, rows: list[dict]) -> None:
+        await session.execute(insert(RankHistory), rows)
+        await session.execute(_upsert_latest(), latest_rows(rows))
+        await session.execute(_upsert_rollups(), rollup_rows(rows))
+        await session.execute(_refresh_improvements(row["post_id"] for row in rows))
+        await get_data_versions().bump(session, MY_BLOG)
+
+    async def backfill(self) -> bool:
+        """Derive the tables built from RankHistory when a database predates them."""
+        async with async_session_scope() as session:
+            if (await session.exec(select(RankLatest.post_id).limit(1))).first() is None:
+                if (await session.exec(select(RankHistory.id).limit(1))).first() is None:
+                    return False
+                await self._derive_series(session)
+            elif (await session.exec(select(PostImprovement.post_id).limit(1))).first() is not None:
+                return False
+            await session.execute(_refresh_improvements())
+            await get_data_versions().bump(session, MY_BLOG)
+        return True
+
+    async def _derive_series(self, session: AsyncSession) -> None:
+        position = (
+            func.row_number()
+            .over(
+                partition_by=(RankHistory.post_id, RankHistory.keyword),
+                order_by=(RankHistory.measured_at.desc(), RankHistory.id.desc()),
+            )
+            .label("position")
+        )
+        ranked = select(
+            RankHistory.post_id,
+            RankHistory.keyword,
+            RankHistory.rank,
+            RankHistory.measured_at,
+            RankHistory.mode,
+            position,
+        ).subquery()
+        await session.execute(
+            insert(RankLatest).from_select(
+                ["post_id", "keyword", "rank", "measured_at", "mode"],
+                select(ranked.c.post_id, ranked.c.keyword, ranked.c.rank, ranked.c.measured_at, ranked.c.mode).where(
+                    ranked.c.position == 1
+                ),
+            )
+        )
+        dialect = session.bind.dialect.name
+        for period in PERIOD_FORMATS:
+            bucket = _bucket(RankHistory.measured_at, period, dialect)
+            await session.execute(
+                insert(RankRollup).from_select(
+                    _ROLLUP_COLUMNS,
+                    select(
+                        RankHistory.post_id,
+                        RankHistory.keyword,
+                        literal(period),
+                        bucket,
+                        func.count(),
+                        func.sum(RankHistory.rank),
+                        func.min(RankHistory.rank),
+                        func.max(RankHistory.rank),
+                        func.sum(case((RankHistory.rank <= SEARCH_TOP_N, 1), else_=0)),
+                    ).group_by(RankHistory.post_id, RankHistory.keyword, bucket),
+                )
+            )
+
+    async def compact(self, now: datetime | None = None) -> dict[str, int]:
+        """Downsample: drop raw rows and daily rollups older than their retention."""
+        now = now or datetime.utcnow()
+        raw_cutoff = now - timedelta(days=self.settings.rank_raw_retention_days)
+        day_cutoff = (now - timedelta(days=self.settings.rank_daily_retention_days)).strftime(PERIOD_FORMATS["day"])
+        batch_size = self.settings.rank_compact_batch_size
+        removed = {"raw": 0, "daily": 0}
+        # Raw rows go in batches so the write lock is released between them.
+        while True:
+            async with async_session_scope() as session:
+                batch = (
+                    select(RankHistory.id).where(RankHistory.measured_at < raw_cutoff).limit(batch_size).scalar_subquery()
+                )
+                result = await session.execute(delete(RankHistory).where(RankHistory.id.in_(batch)))
+            deleted = result.rowcount or 0
+            removed["raw"] += deleted
+            if deleted < batch_size:
+                break
+            await asyncio.sleep(0)
+        async with async_session_scope() as session:
+            result = await session.execute(
+                delete(RankRollup).where(RankRollup.period == "day", RankRollup.bucket < day_cutoff)
+            )
+            removed["daily"] = result.rowcount or 0
+        return removed
+
+    async def compact_periodically(self, interval: float) -> None:
+        while True:
+            try:
+                removed = await self.compact()
+                if any(removed.values()):
+                    logger.info("ranks: compacted %d raw rows and %d daily rollups", removed["raw"], removed["daily"])
+            except SQLAlchemyError:
+                logger.exception("ranks: compaction failed")
+            await asyncio.sleep(interval)
+
+
+__all__ = ["PERIOD_FORMATS", "RankSeries", "latest_rows", "rollup_rows"]
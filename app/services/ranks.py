@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+import httpx
+from sqlmodel import select
+
+from ..db import async_read_scope
+from ..models import Blog, Post
+from ..providers.http import get_async_client
+from ..providers.naver import (
+    NOT_FOUND_RANK,
+    SEARCH_PAGE_SIZE,
+    SEARCH_TOP_N,
+    NaverSearchProvider,
+    normalize_post_url,
+)
+from ..settings import get_settings
+from .rank_series import RankSeries
+
+
+@dataclass
+class ProbeTarget:
+    post_id: int
+    keyword: str
+    url: str
+
+
+@dataclass
+class ProbeResult:
+    post_id: int
+    keyword: str
+    rank: int
+
+
+class RankProbe:
+    """Pages the Naver blog search Top1000 until a post URL matches.
+
+    Pages of one keyword are fetched through a sliding window of
+    ``page_concurrency`` requests and consumed in order, so the first match
+    wins and the pages still in flight are cancelled. ``max_in_flight`` caps
+    the requests shared by every probe running on the same instance.
+    """
+
+    def __init__(
+        self,
+        naver: NaverSearchProvider,
+        client: httpx.AsyncClient,
+        page_concurrency: int = 3,
+        max_in_flight: int = 16,
+    ) -> None:
+        self.naver = naver
+        self.client = client
+        self.page_concurrency = page_concurrency
+        self._gate = asyncio.Semaphore(max_in_flight)
+
+    async def probe(self, keyword: str, url: str) -> int:
+        if self.naver.is_stub:
+            return self.naver.stub_rank(keyword, url)
+        target = normalize_post_url(url)
+        starts = iter(range(1, SEARCH_TOP_N + 1, SEARCH_PAGE_SIZE))
+        pending: deque[tuple[int, asyncio.Task[list[str]]]] = deque()
+
+        def fill() -> None:
+            while len(pending) < self.page_concurrency:
+                start = next(starts, None)
+                if start is None:
+                    return
+                pending.append((start, asyncio.create_task(self._page(keyword, start))))
+
+        try:
+            fill()
+            while pending:
+                start, task = pending.popleft()
+                links = await task
+                for offset, link in enumerate(links):
+                    if normalize_post_url(link) == target:
+                        return start + offset
+                if len(links) < SEARCH_PAGE_SIZE:
+                    return NOT_FOUND_RANK
+                fill()
+        finally:
+            for _, task in pending:
+                task.cancel()
+        return NOT_FOUND_RANK
+
+    async def probe_many(self, targets: list[ProbeTarget]) -> tuple[list[ProbeResult], int]:
+        outcomes = await asyncio.gather(
+            *(self.probe(target.keyword, target.url) for target in targets),
+            return_exceptions=True,
+        )
+        results: list[ProbeResult] = []
+        failed = 0
+        for target, outcome in zip(targets, outcomes):
+            if isinstance(outcome, BaseException):
+                failed += 1
+                continue
+            results.append(ProbeResult(post_id=target.post_id, keyword=target.keyword, rank=outcome))
+        return results, failed
+
+    async def _page(self, keyword: str, start: int) -> list[str]:
+        async with self._gate:
+            return await self.naver.blog_search_links(self.client, keyword, start)
+
+
+class RankService:
+    def __init__(self, client: httpx.AsyncClient | None = None) -> None:
+        self.settings = get_settings()
+        self.naver = NaverSearchProvider()
+        self.client = client
+
+    async def refresh_ranks(self, user_id: int) -> dict:
+        targets = await self._load_targets(user_id)
+        probe = RankProbe(
+            self.naver,
+            self.client or get_async_client(),
+            page_concurrency=self.settings.rank_probe_page_concurrency,
+            max_in_flight=self.settings.rank_probe_max_in_flight,
+        )
+        results, failed = await probe.probe_many(targets)
+        await self._store_results(results, "sim")
+        found = sum(1 for result in results if result.rank != NOT_FOUND_RANK)
+        return {
+            "probed": len(targets),
+            "found": found,
+            "not_found": len(results) - found,
+            "failed": failed,
+        }
+
+    async def _load_targets(self, user_id: int) -> list[ProbeTarget]:
+        async with async_read_scope() as session:
+            rows = await session.exec(
+                select(Post.id, Post.main_keyword, Post.url)
+                .join(Blog, Blog.id == Post.blog_id)
+                .where(Blog.owner_user_id == user_id, Post.main_keyword.is_not(None))
+            )
+            return [ProbeTarget(post_id=post_id, keyword=keyword, url=url) for post_id, keyword, url in rows.all()]
+
+    async def _store_results(self, results: list[ProbeResult], mode: str) -> None:
+        if not results:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                "post_id": result.post_id,
+                "keyword": result.keyword,
+                "rank": result.rank,
+                "measured_at": now,
+                "mode": mode,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for result in results
+        ]
+        await RankSeries().record(rows)
+
+
+__all__ = ["RankProbe", "RankService", "ProbeTarget", "ProbeResult"]
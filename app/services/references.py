@@ -1,57 +1,194 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta
 from typing import Iterable
 
-from sqlmodel import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import delete, select
 
-from ..db import session_scope
-from ..models import RefCardExternal, RefCardMyBlog
+from ..db import async_read_scope, async_session_scope, dialect_insert
+from ..models import Blog, Post, PostImprovement, RefCardExternal, RefCardMyBlog
 from ..providers.naver import NaverSearchProvider
+from ..providers.web import PageOutline, get_page_fetcher, site_key
+from ..settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_SPONSORED = re.compile(r"협찬|광고|체험단|원고료|소정의")
+
+
+def score_page(keyword: str, page: PageOutline) -> tuple[float, list[str]]:
+    """Cheap structural score of a fetched page, with the flags that explain it.
+
+    Unreachable pages score below everything; pages that were not fetched
+    score zero, so they keep their original order.
+    """
+    if page.error:
+        return -1.0, ["unreachable"]
+    score = 0.0
+    flags: list[str] = []
+    needle = keyword.replace(" ", "").lower()
+    title = (page.title or "").replace(" ", "").lower()
+    if needle and needle in title:
+        score += 2.0
+    h2 = sum(1 for level, _ in page.headings if level == 2)
+    h3 = len(page.headings) - h2
+    score += 0.5 * min(h2, 6) + 0.25 * min(h3, 6)
+    if h2 >= 3:
+        flags.append("structured")
+    terms = keyword.lower().split()
+    if terms and any(term in text.lower() for _, text in page.headings for term in terms):
+        score += 1.0
+    if page.text_chars:
+        if page.text_chars < 800:
+            score -= 1.0
+            flags.append("thin")
+        elif page.text_chars >= 2000:
+            score += 1.0
+    score += 0.1 * min(page.images, 10)
+    if page.postdate:
+        try:
+            age = (datetime.utcnow() - datetime.strptime(page.postdate, "%Y-%m-%d")).days
+        except ValueError:
+            age = None
+        if age is not None and age <= 365:
+            score += 1.0
+        elif age is not None and age > 3 * 365:
+            score -= 0.5
+            flags.append("stale")
+    if _SPONSORED.search(" ".join([page.title or "", *(text for _, text in page.headings)])):
+        score -= 2.0
+        flags.append("sponsored")
+    return score, flags
 
 
 class ReferenceService:
     def __init__(self) -> None:
+        self.settings = get_settings()
         self.naver = NaverSearchProvider()
+        self.fetcher = get_page_fetcher()
 
-    def external_cards(self, keyword: str, urls: Iterable[str]) -> list[dict]:
-        cards = self.naver.evaluate_external_refs(keyword, urls)
-        with session_scope() as session:
-            for card in cards:
-                record = session.exec(select(RefCardExternal).where(RefCardExternal.url == card["url"])).first()
-                if not record:
-                    record = RefCardExternal(
-                        keyword=keyword,
-                        title=card["title"],
-                        url=card["url"],
-                        postdate=card.get("postdate"),
-                        summary=card.get("summary"),
-                        why=card.get("why"),
-                        flags=",".join(card.get("flags", [])),
-                    )
-                    session.add(record)
-                else:
-                    record.title = card["title"]
-                    record.summary = card.get("summary")
-                    record.why = card.get("why")
-                    record.flags = ",".join(card.get("flags", []))
-                    session.add(record)
+    async def external_cards(self, keyword: str, urls: Iterable[str]) -> list[dict]:
+        """Evaluate the first ``reference_max_urls`` URLs, keeping one per site (PRD 4.4).
+
+        Pages are fetched concurrently and scored structurally; only the best
+        ``reference_top_k`` reach the evaluator.
+        """
+        candidates = self._one_per_site(urls)[: self.settings.reference_max_urls]
+        if self.settings.dev_allow_http_fetch:
+            pages = await self.fetcher.fetch_many(candidates)
+        else:
+            pages = [PageOutline(url=url) for url in candidates]
+        scored = sorted(
+            ((score_page(keyword, page), order, page) for order, page in enumerate(pages)),
+            key=lambda item: (-item[0][0], item[1]),
+        )[: self.settings.reference_top_k]
+        cards = await self.naver.evaluate_external_refs(keyword, [page for _, _, page in scored])
+        for card, ((_, flags), _, _) in zip(cards, scored):
+            card["flags"] = [*card.get("flags", []), *(flag for flag in flags if flag not in card.get("flags", []))]
+        await self._store_cards(keyword, cards)
         return cards
 
-    def my_blog_cards(self, limit: int = 3) -> list[dict]:
-        with session_scope() as session:
-            results = session.exec(
-                select(RefCardMyBlog).order_by(RefCardMyBlog.updated_at.desc()).limit(limit)
+    async def prune_stale_cards(self) -> int:
+        """Delete external cards not refreshed within ``reference_card_retention_days``."""
+        cutoff = datetime.utcnow() - timedelta(days=self.settings.reference_card_retention_days)
+        async with async_session_scope() as session:
+            result = await session.execute(delete(RefCardExternal).where(RefCardExternal.updated_at < cutoff))
+            return result.rowcount or 0
+
+    async def prune_periodically(self, interval: float) -> None:
+        while True:
+            try:
+                removed = await self.prune_stale_cards()
+                if removed:
+                    logger.info("references: pruned %d stale external cards", removed)
+            except SQLAlchemyError:
+                logger.exception("references: pruning external cards failed")
+            await asyncio.sleep(interval)
+
+    async def my_blog_cards(self, user_id: int, limit: int = 3) -> list[dict]:
+        """The user's posts that climbed most from their expected rank at publish (PRD 4.4).
+
+        Read top-k from PostImprovement; while fewer posts have been measured,
+        the most recently updated cards fill the remaining slots.
+        """
+        columns = (
+            RefCardMyBlog.post_id,
+            RefCardMyBlog.url,
+            RefCardMyBlog.title,
+            RefCardMyBlog.summary,
+            RefCardMyBlog.postdate,
+        )
+        async with async_read_scope() as session:
+            rows = (
+                await session.exec(
+                    select(*columns)
+                    .select_from(PostImprovement)
+                    .join(RefCardMyBlog, RefCardMyBlog.post_id == PostImprovement.post_id)
+                    .where(PostImprovement.owner_user_id == user_id)
+                    .order_by(PostImprovement.improvement.desc(), PostImprovement.measured_at.desc())
+                    .limit(limit)
+                )
             ).all()
-            return [
-                {
-                    "post_id": card.post_id,
-                    "url": card.url,
-                    "title": card.title,
-                    "summary": card.summary,
-                    "postdate": card.postdate,
-                }
-                for card in results
-            ]
-
-
-__all__ = ["ReferenceService"]
+            if len(rows) < limit:
+                chosen = [row.post_id for row in rows]
+                rows += (
+                    await session.exec(
+                        select(*columns)
+                        .join(Post, Post.id == RefCardMyBlog.post_id)
+                        .join(Blog, Blog.id == Post.blog_id)
+                        .where(Blog.owner_user_id == user_id, RefCardMyBlog.post_id.not_in(chosen))
+                        .order_by(RefCardMyBlog.updated_at.desc())
+                        .limit(limit - len(rows))
+                    )
+                ).all()
+        return [
+            {"post_id": post_id, "url": url, "title": title, "summary": summary, "postdate": postdate}
+            for post_id, url, title, summary, postdate in rows
+        ]
+
+    async def _store_cards(self, keyword: str, cards: list[dict]) -> None:
+        # One statement per search: cards already stored for (keyword, url) are refreshed in place.
+        if not cards:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                "keyword": keyword,
+                "title": card["title"],
+                "url": card["url"],
+                "postdate": card.get("postdate"),
+                "summary": card.get("summary"),
+                "why": card.get("why"),
+                "flags": ",".join(card.get("flags", [])),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for card in {card["url"]: card for card in cards}.values()
+        ]
+        statement = dialect_insert(RefCardExternal).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["keyword", "url"],
+            set_={
+                column: statement.excluded[column]
+                for column in ("title", "postdate", "summary", "why", "flags", "updated_at")
+            },
+        )
+        async with async_session_scope() as session:
+            await session.execute(statement)
+
+    def _one_per_site(self, urls: Iterable[str]) -> list[str]:
+        seen: set[str] = set()
+        distinct: list[str] = []
+        for url in urls:
+            key = site_key(url)
+            if key not in seen:
+                seen.add(key)
+                distinct.append(url)
+        return distinct
+
+
+__all__ = ["ReferenceService", "score_page"]
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..db import async_read_scope, dialect_insert
+from ..models import DataVersion
+from ..settings import get_settings
+
+API_KEYS = "apikeys"
+CURVE = "curve"
+MY_BLOG = "myblog"
+
+_PENDING_KEYS = "plog_bumped_versions"
+
+
+def blogs_key(user_id: int) -> str:
+    return f"blogs:{user_id}"
+
+
+def collaborators_key(blog_id: int) -> str:
+    return f"collaborators:{blog_id}"
+
+
+def _upsert_bump():
+    stmt = dialect_insert(DataVersion)
+    return stmt.on_conflict_do_update(index_elements=["key"], set_={"version": DataVersion.version + 1})
+
+
+class DataVersions:
+    """Write counters behind the ETags of polled reads.
+
+    Writers bump keys inside their own transaction; once it commits this
+    process forgets the keys and reads them again on next use. Bumps made by
+    other processes are seen at most ``check_interval`` seconds later, the
+    same bound the curve cache gives a refit done elsewhere.
+    """
+
+    def __init__(self, check_interval: float) -> None:
+        self.check_interval = check_interval
+        self._versions: dict[str, tuple[int, float]] = {}
+        self._generation = 0
+
+    async def current(self, *keys: str) -> tuple[int, ...]:
+        now = time.monotonic()
+        stale = [
+            key
+            for key in keys
+            if key not in self._versions or now - self._versions[key][1] >= self.check_interval
+        ]
+        if stale:
+            generation = self._generation
+            async with async_read_scope() as session:
+                rows = dict(
+                    (
+                        await session.exec(
+                            select(DataVersion.key, DataVersion.version).where(DataVersion.key.in_(stale))
+                        )
+                    ).all()
+                )
+            # A commit that landed while reading may be newer than these rows: use them once, keep nothing.
+            checked_at = now if generation == self._generation else float("-inf")
+            for key in stale:
+                self._versions[key] = (rows.get(key, 0), checked_at)
+        return tuple(self._versions[key][0] for key in keys)
+
+    async def etag(self, keys: tuple[str, ...], *variant: object) -> str:
+        """Strong ETag of a read over ``keys``; ``variant`` holds whatever else shapes the body."""
+        versions = await self.current(*keys)
+        digest = hashlib.blake2b(repr((keys, versions, variant)).encode("utf-8"), digest_size=16).hexdigest()
+        return f'"{digest}"'
+
+    async def bump(self, session: AsyncSession, *keys: str) -> None:
+        """Advance ``keys`` in the session's transaction."""
+        await session.execute(_upsert_bump(), [{"key": key, "version": 1} for key in keys])
+        pending = session.info.get(_PENDING_KEYS)
+        if pending is None:
+            pending = session.info[_PENDING_KEYS] = set()
+            event.listen(session.sync_session, "after_commit", self._forget_committed)
+        pending.update(keys)
+
+    def _forget_committed(self, session) -> None:
+        for key in session.info.pop(_PENDING_KEYS, ()):
+            self._versions.pop(key, None)
+        self._generation += 1
+
+
+class VersionedResponseCache:
+    """Serialized bodies of versioned reads, keyed by their ETag.
+
+    A bump changes the ETag, so entries are never invalidated, only evicted
+    least recently used.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[bytes, dict[str, str]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str) -> tuple[bytes, dict[str, str]] | None:
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return entry
+
+    def put(self, etag: str, body: bytes, headers: dict[str, str]) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[etag] = (body, headers)
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_data_versions() -> DataVersions:
+    return DataVersions(get_settings().data_version_check_seconds)
+
+
+@lru_cache(maxsize=1)
+def get_versioned_response_cache() -> VersionedResponseCache:
+    return VersionedResponseCache(get_settings().versioned_response_cache_entries)
+
+
+__all__ = [
+    "API_KEYS",
+    "CURVE",
+    "MY_BLOG",
+    "DataVersions",
+    "VersionedResponseCache",
+    "blogs_key",
+    "collaborators_key",
+    "get_data_versions",
+    "get_versioned_response_cache",
+]
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable
+
+from sqlalchemy import tuple_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..db import async_session_scope, dialect_insert
+from ..models import KeywordVolume
+from ..providers.naver import NaverSearchProvider
+from ..settings import get_settings
+
+
+async def store_keyword_volumes(session: AsyncSession, volumes: dict[str, dict]) -> dict[str, dict]:
+    """Persist ``{keyword: {"month", "total"}}`` with one read and one multi-row insert.
+
+    Rows that already exist for ``(keyword, month)`` win over the given totals,
+    matching what a per-keyword get-or-create would have returned.
+    """
+    if not volumes:
+        return {}
+    pairs = [(keyword, info["month"]) for keyword, info in volumes.items()]
+    rows = await session.exec(
+        select(KeywordVolume.keyword, KeywordVolume.month, KeywordVolume.volume_total).where(
+            tuple_(KeywordVolume.keyword, KeywordVolume.month).in_(pairs)
+        )
+    )
+    existing = {(keyword, month): total for keyword, month, total in rows.all()}
+    now = datetime.utcnow()
+    missing = [
+        {
+            "keyword": keyword,
+            "month": month,
+            "volume_total": volumes[keyword]["total"],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for keyword, month in pairs
+        if (keyword, month) not in existing
+    ]
+    if missing:
+        await session.execute(
+            dialect_insert(KeywordVolume).values(missing).on_conflict_do_nothing(index_elements=["keyword", "month"])
+        )
+    return {
+        keyword: {"month": month, "total": existing.get((keyword, month), volumes[keyword]["total"])}
+        for keyword, month in pairs
+    }
+
+
+class VolumeCache:
+    """Monthly search volumes cached in a bounded LRU over the KeywordVolume table.
+
+    Keys carry the provider's ``YYYY-MM`` month, so when the month rolls over
+    every entry misses and the memory tier is dropped in one go.
+    """
+
+    def __init__(self, naver: NaverSearchProvider, max_entries: int) -> None:
+        self.naver = naver
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._month: str | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_many(self, keywords: Iterable[str], session: AsyncSession | None = None) -> dict[str, dict]:
+        month = self.naver.volume_month()
+        keywords = list(dict.fromkeys(keywords))
+        found: dict[str, int] = {}
+        with self._lock:
+            if month != self._month:
+                self._entries.clear()
+                self._month = month
+            for keyword in keywords:
+                total = self._entries.get(keyword)
+                if total is not None:
+                    self._entries.move_to_end(keyword)
+                    found[keyword] = total
+            self.hits += len(found)
+
+        pending = [keyword for keyword in keywords if keyword not in found]
+        if pending:
+            if session is None:
+                async with async_session_scope() as scoped:
+                    loaded = await self._load(scoped, pending, month)
+            else:
+                loaded = await self._load(session, pending, month)
+            found.update(loaded)
+            self._remember(month, loaded)
+        return {keyword: {"month": month, "total": found[keyword]} for keyword in keywords}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "month": self._month,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    async def _load(self, session: AsyncSession, keywords: list[str], month: str) -> dict[str, int]:
+        rows = await session.exec(
+            select(KeywordVolume.keyword, KeywordVolume.volume_total).where(
+                KeywordVolume.keyword.in_(keywords), KeywordVolume.month == month
+            )
+        )
+        stored = dict(rows.all())
+        missing = [keyword for keyword in keywords if keyword not in stored]
+        fetched = await asyncio.gather(*(self.naver.monthly_search_volume(keyword) for keyword in missing))
+        resolved = dict(zip(missing, fetched))
+        for keyword, info in (await store_keyword_volumes(session, resolved)).items():
+            stored[keyword] = info["total"]
+        with self._lock:
+            self.persistent_hits += len(keywords) - len(missing)
+            self.misses += len(missing)
+        return stored
+
+    def _remember(self, month: str, loaded: dict[str, int]) -> None:
+        with self._lock:
+            if month != self._month:
+                return
+            self._entries.update(loaded)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+@lru_cache(maxsize=1)
+def get_volume_cache() -> VolumeCache:
+    return VolumeCache(NaverSearchProvider(), get_settings().volume_cache_max_entries)
+
+
+__all__ = ["VolumeCache", "get_volume_cache", "store_keyword_volumes"]
@@ -11,6 +11,14 @@ class Settings(BaseSettings):
 
     environment: str = Field(default="dev")
     database_url: str = Field(default="sqlite:///./plog.db")
+    db_pool_size: int = Field(default=5, ge=1)
+    db_max_overflow: int = Field(default=10, ge=0)
+    db_pool_timeout_seconds: float = Field(default=30.0, gt=0)
+    sqlite_journal_mode: str = Field(default="WAL", pattern=r"^(?i:wal|delete|truncate|persist|memory)$")
+    sqlite_synchronous: str = Field(default="NORMAL", pattern=r"^(?i:off|normal|full|extra)$")
+    sqlite_cache_size_kib: int = Field(default=64 * 1024, ge=0)
+    sqlite_mmap_size_bytes: int = Field(default=256 * 1024 * 1024, ge=0)
+    sqlite_busy_timeout_ms: int = Field(default=5000, ge=0)
     openai_api_key: str | None = Field(
         default=None,
         validation_alias=AliasChoices("openai_api_key", "OPENAI_API_KEY"),
@@ -41,6 +49,53 @@ class Settings(BaseSettings):
         default=False,
         validation_alias=AliasChoices("dev_allow_http_fetch", "DEV_ALLOW_HTTP_FETCH"),
     )
+    # Demo/test only: answer keyword extraction with data/sample_candidates.json whatever the draft.
+    dev_sample_candidates: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("dev_sample_candidates", "DEV_SAMPLE_CANDIDATES"),
+    )
+    naver_search_base_url: str = Field(
+        default="https://openapi.naver.com",
+        validation_alias=AliasChoices("naver_search_base_url", "NAVER_SEARCH_BASE_URL"),
+    )
+    http_timeout_seconds: float = Field(default=10.0)
+    http_max_connections: int = Field(default=50)
+    rank_probe_page_concurrency: int = Field(default=3, ge=1)
+    rank_probe_max_in_flight: int = Field(default=16, ge=1)
+    curve_cache_check_seconds: float = Field(default=5.0, ge=0)
+    volume_cache_max_entries: int = Field(default=4096, ge=1)
+    auth_cache_ttl_seconds: float = Field(default=60.0, ge=0)
+    auth_cache_max_entries: int = Field(default=10_000, ge=1)
+    compose_section_concurrency: int = Field(default=4, ge=1)
+    llm_cache_dir: str = Field(default=".cache/llm")
+    llm_cache_memory_entries: int = Field(default=256, ge=1)
+    llm_cache_max_bytes: int = Field(default=64 * 1024 * 1024, ge=0)
+    registry_poll_seconds: float = Field(default=2.0, gt=0)
+    reference_max_urls: int = Field(default=10, ge=1)
+    reference_top_k: int = Field(default=3, ge=1)
+    reference_fetch_per_host: int = Field(default=2, ge=1)
+    reference_fetch_max_bytes: int = Field(default=512 * 1024, ge=1024)
+    reference_fetch_timeout_seconds: float = Field(default=5.0, gt=0)
+    reference_card_retention_days: int = Field(default=30, ge=1)
+    reference_prune_interval_seconds: float = Field(default=3600.0, gt=0)
+    verification_fetch_max_bytes: int = Field(default=1024 * 1024, ge=1024)
+    verification_fetch_timeout_seconds: float = Field(default=5.0, gt=0)
+    job_workers: int = Field(default=2, ge=1)
+    job_poll_seconds: float = Field(default=1.0, gt=0)
+    job_max_attempts: int = Field(default=3, ge=1)
+    job_retry_backoff_seconds: float = Field(default=2.0, ge=0)
+    job_lease_seconds: float = Field(default=60.0, gt=0)
+    import_batch_size: int = Field(default=1000, ge=1)
+    import_workers: int = Field(default=2, ge=1)
+    rank_raw_retention_days: int = Field(default=90, ge=1)
+    rank_daily_retention_days: int = Field(default=730, ge=1)
+    rank_compact_interval_seconds: float = Field(default=6 * 3600.0, gt=0)
+    rank_compact_batch_size: int = Field(default=10_000, ge=1)
+    server_timing_enabled: bool = Field(default=True)
+    query_debug_mode: str = Field(default="off", pattern=r"^(off|log|raise)$")
+    query_repeat_threshold: int = Field(default=5, ge=1)
+    data_version_check_seconds: float = Field(default=1.0, ge=0)
+    versioned_response_cache_entries: int = Field(default=512, ge=0)
 
 
 @lru_cache(maxsize=1)
@@ -0,0 +1,173 @@
+"""Fill a database with synthetic data at production-like scale.
+
+Defaults match the benchmark target: 1k blogs, 50k posts, 1M RankHistory
+rows and 100k KeywordVolume rows; ``--scale`` shrinks or grows everything
+proportionally. Rows are written with multi-row core inserts in a handful of
+transactions, and the tables derived from the raw rank rows are built the
+way an upgraded database gets them, so a full-scale SQLite file takes about a
+minute.
+
+    python -m benchmarks.generate sqlite:///./bench.db --scale 0.1
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, Iterator
+
+CHUNK = 5000
+TOPICS = ["아토피", "보습", "여드름", "두드러기", "습진", "건선", "비염", "탈모", "흉터", "기미", "레이저", "주사"]
+MODIFIERS = ["환절기", "아이", "성인", "치료", "원인", "관리", "증상", "연고", "병원", "후기", "가격", "예방"]
+
+
+@dataclass
+class Scale:
+    users: int = 250
+    blogs: int = 1_000
+    posts: int = 50_000
+    ranks: int = 1_000_000
+    volumes: int = 100_000
+
+    def scaled(self, factor: float) -> "Scale":
+        return Scale(**{name: max(1, int(value * factor)) for name, value in vars(self).items()})
+
+
+def keyword_pool(size: int) -> list[str]:
+    pool = [f"{modifier} {topic}" for topic in TOPICS for modifier in MODIFIERS]
+    suffix = 0
+    while len(pool) < size:
+        suffix += 1
+        pool.extend(f"{modifier} {topic} {suffix}" for topic in TOPICS for modifier in MODIFIERS)
+    return pool[:size]
+
+
+def _chunks(rows: Iterable[dict], size: int = CHUNK) -> Iterator[list[dict]]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def generate(database_url: str, scale: Scale, seed: int = 7) -> dict:
+    os.environ["DATABASE_URL"] = database_url
+    from sqlalchemy import insert
+
+    from app.db import _engine, dispose_engines, init_db
+    from app.models import Blog, BlogVerification, KeywordVolume, Post, RankHistory, RefCardMyBlog, User
+    from app.services.rank_series import RankSeries
+
+    rng = random.Random(seed)
+    init_db()
+    now = datetime.utcnow()
+    stamps = {"created_at": now, "updated_at": now}
+    months = [(now.replace(day=1) - timedelta(days=31 * offset)).strftime("%Y-%m") for offset in range(12)]
+    keywords = keyword_pool(max(1, scale.volumes // len(months)))
+    timings: dict[str, float] = {}
+
+    def write(model, rows: Iterable[dict]) -> None:
+        started = time.perf_counter()
+        with _engine.begin() as connection:
+            for chunk in _chunks(rows):
+                connection.execute(insert(model), chunk)
+        timings[model.__tablename__] = round(time.perf_counter() - started, 2)
+
+    write(User, ({"google_sub": f"bench-{i}", "email": f"bench{i}@example.com", "display_name": f"벤치 {i}", **stamps} for i in range(scale.users)))
+    write(
+        Blog,
+        (
+            {
+                "owner_user_id": 1 + i % scale.users,
+                "naver_blog_id": f"bench{i}",
+                "title": f"벤치 블로그 {i}",
+                "status": "VERIFIED" if i % 3 else "PENDING",
+                "created_at": now - timedelta(minutes=i),
+                "updated_at": now,
+            }
+            for i in range(scale.blogs)
+        ),
+    )
+    write(
+        BlogVerification,
+        ({"blog_id": 1 + i, "title_token": f"t{i}", "body_token": f"b{i}", **stamps} for i in range(scale.blogs)),
+    )
+    # Ranks are probed for each post's main keyword, as RankService does.
+    post_keywords = [rng.choice(keywords) for _ in range(scale.posts)]
+    write(
+        Post,
+        (
+            {
+                "blog_id": 1 + i % scale.blogs,
+                "url": f"https://blog.naver.com/bench{i % scale.blogs}/{100000 + i}",
+                "main_keyword": post_keywords[i],
+                "published_at": now - timedelta(days=rng.randrange(365)),
+                "expected_rank_at_publish": rng.randrange(1, 60),
+                **stamps,
+            }
+            for i in range(scale.posts)
+        ),
+    )
+    write(
+        RefCardMyBlog,
+        (
+            {
+                "post_id": 1 + i,
+                "url": f"https://blog.naver.com/bench{i % scale.blogs}/{100000 + i}",
+                "title": f"벤치 글 {i}",
+                "summary": "내원 환자 케이스 기반 톤",
+                "postdate": (now - timedelta(days=i % 365)).strftime("%Y-%m-%d"),
+                **stamps,
+            }
+            for i in range(scale.posts)
+        ),
+    )
+    write(
+        RankHistory,
+        (
+            {
+                "post_id": 1 + (i % scale.posts),
+                "keyword": post_keywords[i % scale.posts],
+                "rank": min(1001, int(rng.lognormvariate(3.0, 1.2))) or 1,
+                "measured_at": now - timedelta(hours=i // scale.posts * 24),
+                "mode": "sim",
+                **stamps,
+            }
+            for i in range(scale.ranks)
+        ),
+    )
+
+    async def derive_rank_tables() -> None:
+        try:
+            await RankSeries().backfill()
+        finally:
+            await dispose_engines()
+
+    started = time.perf_counter()
+    asyncio.run(derive_rank_tables())
+    timings["rank-derived"] = round(time.perf_counter() - started, 2)
+    write(
+        KeywordVolume,
+        (
+            {"keyword": keyword, "month": month, "volume_total": int(rng.lognormvariate(7.5, 1.3)), **stamps}
+            for month in months
+            for keyword in keywords
+        ),
+    )
+    return {"scale": vars(scale), "seconds": timings}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database_url")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(generate(args.database_url, Scale().scaled(args.scale), seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""Benchmark every API route in-process and compare against a stored baseline.
+
+The app is driven through ``httpx.ASGITransport`` against a database filled
+by :mod:`benchmarks.generate` (a fresh temporary one at ``--scale`` unless
+``--database-url`` points at an existing file). Every route registered on
+``app.main.app`` needs an entry in ``SCENARIOS``; a route without one fails
+the run so new endpoints cannot slip out of the suite.
+
+Routes behind the versioned response cache or the LLM cache are measured
+cold by default: every iteration bumps the data version the response hangs
+on or sends a draft no earlier request used, so the budget check counts the
+statements of a real rebuild. Their ``(warm)`` scenarios repeat one request
+and measure the cache hit on its own.
+
+Per scenario the run records p50/p95/p99 latency in milliseconds and the mean
+number of SQL statements per request; with ``--repeat`` rounds over all
+routes, the round with the lowest p95 is kept. A scenario fails when a single
+request exceeds the ``query_budget`` its endpoint declares. Against
+``benchmarks/baseline.json`` it regresses when its p95 grows by more than
+``--threshold`` (and by more than ``--min-delta-ms``, so scheduler noise on
+fast routes does not count) or when it issues more queries than before.
+Any failure exits with status 1. ``--scale`` defaults to the scale the
+baseline was recorded at; comparing a run at another scale against it is
+refused, since latencies and row counts are not comparable across scales.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --scale 0.1 --update-baseline
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DRAFT = (
+    "환절기만 되면 아이 아토피가 심해져서 내원하시는 분들이 많습니다. 아토피 보습은 목욕 직후 3분 안에 "
+    "보습제를 바르는 것이 핵심이고, 실내 습도는 50% 안팎으로 유지하는 것이 좋습니다. "
+) * 6
+VOLUME = {"month": "2025-01", "total": 12800}
+OUTLINE = [
+    {"section_id": "sec-1", "title": "환절기 아토피가 심해지는 이유", "bullets": ["건조한 공기", "온도 차"]},
+    {"section_id": "sec-2", "title": "아토피 보습 루틴", "bullets": ["목욕 후 3분", "습도 50%"]},
+]
+
+
+@dataclass
+class Context:
+    client: object
+    headers: dict[str, str]
+    user_id: int
+    blog_id: int
+    job_id: int = 0
+    serial: int = 0
+
+    def next(self) -> int:
+        self.serial += 1
+        return self.serial
+
+
+Prepare = Callable[[Context], Awaitable[dict]]
+
+
+def static(**request) -> Prepare:
+    async def prepare(ctx: Context) -> dict:
+        return {"headers": ctx.headers, **request}
+
+    return prepare
+
+
+def bumped(keys: Callable[[Context, object], tuple[str, ...]], then: Prepare | None = None) -> Prepare:
+    """Advance the data versions behind a versioned read so its cached body and ETag go stale.
+
+    ``keys`` gets the context and :mod:`app.services.versions`, which is only
+    importable once the database URL is set.
+    """
+
+    async def prepare(ctx: Context) -> dict:
+        from app.db import async_session_scope
+        from app.services import versions
+
+        async with async_session_scope() as session:
+            await versions.get_data_versions().bump(session, *keys(ctx, versions))
+        return await (then or static())(ctx)
+
+    return prepare
+
+
+def fresh_draft(**fields) -> Prepare:
+    """A draft no earlier request sent, so neither the memory nor the disk LLM cache answers it."""
+
+    async def prepare(ctx: Context) -> dict:
+        return {"headers": ctx.headers, "json": {"draft": f"{DRAFT}({ctx.next()})", **fields}}
+
+    return prepare
+
+
+async def _fresh_keywords(ctx: Context) -> dict:
+    serial = ctx.next()
+    return {"headers": ctx.headers, "json": {"keywords": [f"벤치 키워드 {serial}-{i}" for i in range(3)]}}
+
+
+async def _fresh_curve(ctx: Context) -> dict:
+    return {"headers": ctx.headers, "params": {"keywords": f"환절기 아토피,벤치 키워드 {ctx.next()}"}}
+
+
+async def _fresh_blog(ctx: Context) -> dict:
+    response = await ctx.client.post("/blogs", headers=ctx.headers, json={"naver_blog_id": f"bench-new-{ctx.next()}"})
+    return response.json()
+
+
+async def _verify(ctx: Context) -> dict:
+    blog = await _fresh_blog(ctx)
+    body = {"post_url": f"https://blog.naver.com/{blog['naver_blog_id']}/1", "title": blog["title_token"], "body": blog["body_token"]}
+    return {"url": f"/blogs/{blog['id']}/verify", "headers": ctx.headers, "json": body}
+
+
+async def _disown(ctx: Context) -> dict:
+    blog = await _fresh_blog(ctx)
+    return {"url": f"/blogs/{blog['id']}/disown", "headers": ctx.headers}
+
+
+async def _invite(ctx: Context) -> dict:
+    return {
+        "url": f"/blogs/{ctx.blog_id}/collaborators",
+        "headers": ctx.headers,
+        "json": {"email": f"invitee{ctx.next()}@example.com"},
+    }
+
+
+async def _revoke(ctx: Context) -> dict:
+    response = await ctx.client.request(**await _invite(ctx), method="POST")
+    collab_id = response.json()["invitation"]["id"]
+    return {"url": f"/blogs/{ctx.blog_id}/collaborators/{collab_id}", "headers": ctx.headers}
+
+
+async def _logout(ctx: Context) -> dict:
+    response = await ctx.client.post("/auth/google/callback", json={"dev_user": "bench-logout@example.com"})
+    return {"headers": {"X-API-Key": response.json()["api_key"]}}
+
+
+async def _collaborators(ctx: Context) -> dict:
+    return {"url": f"/blogs/{ctx.blog_id}/collaborators", "headers": ctx.headers}
+
+
+async def _job(ctx: Context) -> dict:
+    return {"url": f"/jobs/{ctx.job_id}", "headers": ctx.headers}
+
+
+@dataclass
+class Scenario:
+    method: str
+    path: str
+    prepare: Prepare
+    expect: int = 200
+    iterations: int | None = None
+    variant: str | None = None
+
+    @property
+    def route(self) -> str:
+        return f"{self.method} {self.path}"
+
+    @property
+    def key(self) -> str:
+        return f"{self.route} ({self.variant})" if self.variant else self.route
+
+
+SCENARIOS = [
+    Scenario("GET", "/healthz", static()),
+    Scenario("GET", "/metrics", static()),
+    Scenario("GET", "/cache/stats", static()),
+    Scenario("POST", "/auth/google/callback", static(json={"dev_user": "bench0@example.com"})),
+    Scenario("GET", "/blogs", bumped(lambda ctx, v: (v.blogs_key(ctx.user_id),))),
+    Scenario("GET", "/blogs", static(), variant="warm"),
+    Scenario("POST", "/blogs", static(json={"naver_blog_id": "bench-created"})),
+    Scenario("POST", "/blogs/{blog_id}/verify", _verify),
+    Scenario("POST", "/blogs/{blog_id}/disown", _disown),
+    Scenario("POST", "/blogs/{blog_id}/collaborators", _invite),
+    Scenario("DELETE", "/blogs/{blog_id}/collaborators/{collab_id}", _revoke),
+    Scenario(
+        "GET", "/blogs/{blog_id}/collaborators", bumped(lambda ctx, v: (v.collaborators_key(ctx.blog_id),), _collaborators)
+    ),
+    Scenario("GET", "/blogs/{blog_id}/collaborators", _collaborators, variant="warm"),
+    Scenario("POST", "/keywords/extract", fresh_draft()),
+    Scenario("POST", "/keywords/extract", static(json={"draft": DRAFT}), variant="warm"),
+    Scenario("POST", "/keywords/volume", _fresh_keywords),
+    Scenario(
+        "POST", "/keywords/volume", static(json={"keywords": ["환절기 아토피", "아이 보습", "성인 여드름"]}), variant="warm"
+    ),
+    Scenario("GET", "/curve", _fresh_curve),
+    Scenario("GET", "/curve", static(params={"keywords": "환절기 아토피,아이 보습"}), variant="warm"),
+    Scenario("GET", "/curve", static(params={"refresh": "true"}), iterations=20, variant="refit"),
+    Scenario("POST", "/ranks/refresh", static(), iterations=5),
+    Scenario("POST", "/jobs", static(json={"kind": "rank_refresh"}), expect=202),
+    Scenario("GET", "/jobs/{job_id}", _job),
+    Scenario(
+        "POST",
+        "/references/external",
+        static(json={"keyword": "환절기 아토피", "urls": [f"https://site{i}.example.com/post/{i}" for i in range(5)]}),
+    ),
+    Scenario("GET", "/references/myblog", bumped(lambda ctx, v: (v.MY_BLOG,))),
+    Scenario("GET", "/references/myblog", static(), variant="warm"),
+    Scenario("POST", "/outline/plan", fresh_draft(keyword="환절기 아토피", volume=VOLUME)),
+    Scenario(
+        "POST",
+        "/outline/plan",
+        static(json={"draft": DRAFT, "keyword": "환절기 아토피", "volume": VOLUME}),
+        variant="warm",
+    ),
+    Scenario("POST", "/compose_with_research", fresh_draft(keyword="환절기 아토피", volume=VOLUME, outline=OUTLINE)),
+    Scenario(
+        "POST",
+        "/compose_with_research",
+        static(json={"draft": DRAFT, "keyword": "환절기 아토피", "volume": VOLUME, "outline": OUTLINE}),
+        variant="warm",
+    ),
+    Scenario(
+        "POST", "/compose_with_research/stream", fresh_draft(keyword="환절기 아토피", volume=VOLUME, outline=OUTLINE)
+    ),
+    Scenario(
+        "POST",
+        "/compose_with_research/stream",
+        static(json={"draft": DRAFT, "keyword": "환절기 아토피", "volume": VOLUME, "outline": OUTLINE}),
+        variant="warm",
+    ),
+    # Each logout revokes a key issued for it alone, never the shared one.
+    Scenario("POST", "/auth/logout", _logout),
+]
+
+
+@dataclass
+class QueryCounter:
+    count: int = 0
+
+    def record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.count += 1
+
+
+@dataclass
+class Result:
+    latencies_ms: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        ordered = sorted(self.latencies_ms)
+        cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+        return {
+            "requests": len(ordered),
+            "p50_ms": round(cuts[49], 3),
+            "p95_ms": round(cuts[94], 3),
+            "p99_ms": round(cuts[98], 3),
+            "queries": round(statistics.fmean(self.queries), 2),
+            "max_queries": max(self.queries),
+        }
+
+
+def _percent(old: float, new: float) -> str:
+    return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list[str]:
+    regressions = []
+    for key, current in results.items():
+        if current.get("budget") is not None and current["max_queries"] > current["budget"]:
+            regressions.append(f"{key}: {current['max_queries']} queries in one request, budget is {current['budget']}")
+        previous = baseline.get("routes", {}).get(key)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + threshold) and current["p95_ms"] - previous["p95_ms"] > min_delta_ms:
+            regressions.append(
+                f"{key}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms ({_percent(previous['p95_ms'], current['p95_ms'])})"
+            )
+        if current["queries"] > previous["queries"]:
+            regressions.append(f"{key}: queries/request {previous['queries']} -> {current['queries']}")
+    return regressions
+
+
+async def bench(iterations: int, warmup: int, repeat: int) -> dict:
+    import httpx
+    from fastapi.routing import APIRoute
+    from sqlalchemy import event
+    from sqlmodel import select
+
+    from app.bootstrap import bootstrap_sample_data
+    from app.db import _async_engine, _engine, async_read_scope, dispose_engines, init_db
+    from app.main import app
+    from app.models import Blog, User
+    from app.services.auth import AuthService
+    from app.services.jobs import get_job_queue
+    from app.services.rank_series import RankSeries
+
+    budgets = {
+        f"{method} {route.path}": getattr(route.endpoint, "query_budget", None)
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    missing = budgets.keys() - {scenario.route for scenario in SCENARIOS}
+    if missing:
+        raise SystemExit(f"no benchmark scenario for: {', '.join(sorted(missing))}")
+
+    counter = QueryCounter()
+    for engine in (_engine, _async_engine.sync_engine):
+        event.listen(engine, "before_cursor_execute", counter.record)
+
+    # Startup hooks are not run on purpose: the job workers and pruning loop
+    # would compete with the requests being timed.
+    init_db()
+    await bootstrap_sample_data()
+    await RankSeries().backfill()
+    async with async_read_scope() as session:
+        user = (await session.exec(select(User).where(User.email == "bench0@example.com"))).first()
+        if user is None:
+            raise SystemExit("database has no generated data; run benchmarks.generate first")
+        blog = (await session.exec(select(Blog).where(Blog.owner_user_id == user.id).order_by(Blog.id))).first()
+    session_payload = await AuthService().issue_session(user)
+    headers = {"X-API-Key": session_payload["api_key"]}
+    job = await get_job_queue().enqueue("rank_refresh", {}, user_id=user.id)
+
+    results: dict[str, dict] = {}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            ctx = Context(client=client, headers=headers, user_id=user.id, blog_id=blog.id, job_id=job.id)
+            for round_ in range(repeat):
+                for scenario in SCENARIOS:
+                    result = Result()
+                    gc.collect()
+                    rounds = scenario.iterations or iterations
+                    for index in range(warmup + rounds):
+                        request = {"url": scenario.path, **await scenario.prepare(ctx)}
+                        counter.count = 0
+                        started = time.perf_counter()
+                        response = await client.request(scenario.method, **request)
+                        elapsed = (time.perf_counter() - started) * 1000
+                        if response.status_code != scenario.expect:
+                            raise SystemExit(
+                                f"{scenario.key}: expected {scenario.expect}, got {response.status_code} {response.text[:200]}"
+                            )
+                        if index >= warmup:
+                            result.latencies_ms.append(elapsed)
+                            result.queries.append(counter.count)
+                    summary = {**result.summary(), "budget": budgets[scenario.route]}
+                    # Keep the quietest round per route, as timeit keeps the fastest repeat.
+                    if scenario.key not in results or summary["p95_ms"] < results[scenario.key]["p95_ms"]:
+                        results[scenario.key] = summary
+                    print(f"[{round_ + 1}/{repeat}] {scenario.key:<48} {json.dumps(summary)}", file=sys.stderr)
+    finally:
+        await dispose_engines()
+    return results
+
+
+def _generate(database_url: str, scale: float) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.generate", database_url, "--scale", str(scale)],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="existing database filled by benchmarks.generate")
+    parser.add_argument("--scale", type=float, help="dataset scale; defaults to the baseline's, else 1.0")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="rounds over all routes; the lowest p95 counts")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative p95 growth")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore p95 growth below this")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    if args.scale is None:
+        args.scale = float(baseline.get("scale", 1.0)) if baseline else 1.0
+    elif baseline and not args.update_baseline and baseline.get("scale") != args.scale:
+        raise SystemExit(
+            f"baseline was recorded at scale {baseline.get('scale')}, this run would use {args.scale}; "
+            "pass the same --scale or re-record with --update-baseline"
+        )
+
+    workdir = Path(tempfile.mkdtemp(prefix="plog-bench-"))
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{workdir / 'bench.db'}"
+        _generate(database_url, args.scale)
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("LLM_CACHE_DIR", str(workdir / "llm"))
+    # Nothing else writes to the database, and bumps made here are seen at once; without
+    # this the once-a-second data version reads (API keys, ETags) land on whichever
+    # route is running and make its query count depend on timing.
+    os.environ.setdefault("DATA_VERSION_CHECK_SECONDS", "3600")
+
+    results = asyncio.run(bench(args.iterations, args.warmup, args.repeat))
+    report = {"scale": args.scale, "iterations": args.iterations, "repeat": args.repeat, "routes": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"no baseline at {args.baseline}; run with --update-baseline first")
+        return
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        raise SystemExit(1)
+    print(f"{len(results)} routes within {args.threshold:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Compare the SQLite storage profiles under a multi-process read/write mix.
+
+Each profile gets a fresh database file. ``--processes`` worker processes
+(standing in for uvicorn workers) each run ``--tasks`` concurrent coroutines
+for ``--seconds``: every ``--write-every``-th operation inserts a RankHistory
+batch through ``async_session_scope``; the others read through
+``async_read_scope``. Reported per profile: total operations per second,
+reads and writes completed, and "database is locked" failures.
+
+    python -m benchmarks.sqlite_profile --processes 4 --seconds 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from pathlib import Path
+
+PROFILES = {
+    # What the engine did before: rollback journal, full sync, small cache, no mmap.
+    "legacy": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_CACHE_SIZE_KIB": "2000",
+        "SQLITE_MMAP_SIZE_BYTES": "0",
+        "SQLITE_BUSY_TIMEOUT_MS": "5000",
+    },
+    "tuned": {},
+}
+
+
+def _seed(database_url: str, posts: int) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    from sqlmodel import Session
+
+    from app.db import _engine, init_db
+    from app.models import Blog, Post, User
+
+    init_db()
+    with Session(_engine) as session:
+        user = User(google_sub="bench", email="bench@example.com")
+        session.add(user)
+        session.flush()
+        blog = Blog(owner_user_id=user.id, naver_blog_id="bench")
+        session.add(blog)
+        session.flush()
+        session.add_all(
+            Post(blog_id=blog.id, url=f"https://blog.naver.com/bench/{i}", main_keyword=f"키워드 {i % 200}")
+            for i in range(posts)
+        )
+        session.commit()
+
+
+def _worker(database_url: str, env: dict, tasks: int, seconds: float, write_every: int, queue) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.update(env)
+    from datetime import datetime
+
+    from sqlalchemy.exc import OperationalError
+    from sqlmodel import func, insert, select
+
+    from app.db import async_read_scope, async_session_scope, dispose_engines
+    from app.models import Post, RankHistory
+
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+
+    async def run(seed: int) -> None:
+        deadline = time.monotonic() + seconds
+        op = seed
+        while time.monotonic() < deadline:
+            op += 1
+            try:
+                if op % write_every == 0:
+                    now = datetime.utcnow()
+                    rows = [
+                        {"post_id": 1 + (op + i) % 500, "keyword": "키워드", "rank": 1 + i, "measured_at": now,
+                         "mode": "bench", "created_at": now, "updated_at": now}
+                        for i in range(20)
+                    ]
+                    async with async_session_scope() as session:
+                        await session.execute(insert(RankHistory), rows)
+                    counts["writes"] += 1
+                else:
+                    async with async_read_scope() as session:
+                        await session.exec(
+                            select(Post.main_keyword, func.count()).group_by(Post.main_keyword).limit(20)
+                        )
+                    counts["reads"] += 1
+            except OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+                counts["locked"] += 1
+
+    async def main() -> None:
+        await asyncio.gather(*(run(seed) for seed in range(tasks)))
+        await dispose_engines()
+
+    asyncio.run(main())
+    queue.put(counts)
+
+
+def bench_profile(name: str, args: argparse.Namespace) -> dict:
+    directory = Path(tempfile.mkdtemp(prefix=f"plog-{name}-"))
+    database_url = f"sqlite:///{directory / 'bench.db'}"
+    env = PROFILES[name]
+    seeder = mp.Process(target=_seed, args=(database_url, args.posts))
+    seeder.start()
+    seeder.join()
+    queue = mp.Queue()
+    workers = [
+        mp.Process(target=_worker, args=(database_url, env, args.tasks, args.seconds, args.write_every, queue))
+        for _ in range(args.processes)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    totals = {"reads": 0, "writes": 0, "locked": 0}
+    for _ in workers:
+        for key, value in queue.get().items():
+            totals[key] += value
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "profile": name,
+        "ops_per_second": round((totals["reads"] + totals["writes"]) / elapsed, 1),
+        **totals,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=8, help="concurrent coroutines per process")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--write-every", type=int, default=10)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append")
+    args = parser.parse_args()
+    mp.set_start_method("spawn", force=True)
+    for name in args.profile or ["legacy", "tuned"]:
+        print(json.dumps(bench_profile(name, args), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
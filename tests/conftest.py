@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+import pytest
+
+# Settings are read once at import, so the test database and query guard are set up before the app loads.
+_workdir = tempfile.mkdtemp(prefix="plog-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/plog.db"
+os.environ["LLM_CACHE_DIR"] = f"{_workdir}/llm"
+os.environ["QUERY_DEBUG_MODE"] = "raise"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def api_headers(client: TestClient) -> dict[str, str]:
+    session = client.post("/auth/google/callback", json={"dev_user": "tester@example.com"}).json()
+    return {"X-API-Key": session["api_key"]}
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlmodel import select
+
+from app.db import async_session_scope
+from app.models import ApiKey
+from app.services.auth import hash_api_key
+from app.services.versions import API_KEYS, DataVersions, get_data_versions
+
+
+def test_key_revoked_by_another_process_stops_working(client, monkeypatch):
+    api_key = client.post("/auth/google/callback", json={"dev_user": "revoked@example.com"}).json()["api_key"]
+    headers = {"X-API-Key": api_key}
+    assert client.get("/blogs", headers=headers).status_code == 200
+    monkeypatch.setattr(get_data_versions(), "check_interval", 0)
+
+    async def revoke_elsewhere() -> None:
+        # Another worker's revoke: same rows and version bump, none of this process's cache state.
+        async with async_session_scope() as session:
+            record = (await session.exec(select(ApiKey).where(ApiKey.key_hash == hash_api_key(api_key)))).one()
+            record.revoked_at = datetime.utcnow()
+            session.add(record)
+            await DataVersions(check_interval=0).bump(session, API_KEYS)
+
+    client.portal.call(revoke_elsewhere)
+    assert client.get("/blogs", headers=headers).status_code == 401
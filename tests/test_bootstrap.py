@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from sqlmodel import func, select
+
+from app.bootstrap import bootstrap_sample_data
+from app.db import async_read_scope, async_session_scope
+from app.models import KeywordVolume
+
+
+def test_sample_volumes_are_not_reseeded_into_a_new_month(client):
+    async def count() -> int:
+        async with async_read_scope() as session:
+            return (await session.exec(select(func.count()).select_from(KeywordVolume))).one()
+
+    async def move_months(months: dict[int, str]) -> dict[int, str]:
+        async with async_session_scope() as session:
+            rows = (await session.exec(select(KeywordVolume).where(KeywordVolume.id.in_(months)))).all()
+            previous = {row.id: row.month for row in rows}
+            for row in rows:
+                row.month = months[row.id]
+                session.add(row)
+        return previous
+
+    async def scenario() -> tuple[int, int]:
+        async with async_read_scope() as session:
+            ids = (await session.exec(select(KeywordVolume.id))).all()
+        # Every stored volume is from an earlier month, as after a restart in a later month.
+        original = await move_months({volume_id: "2000-01" for volume_id in ids})
+        try:
+            before = await count()
+            await bootstrap_sample_data()
+            return before, await count()
+        finally:
+            await move_months(original)
+
+    before, after = client.portal.call(scenario)
+    assert before > 0
+    assert after == before
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlmodel import delete, select
+
+from app.db import async_session_scope
+from app.models import CurveModel
+from app.services.curve import get_curve_cache
+from app.services.versions import CURVE, DataVersions, get_data_versions
+
+
+def test_blogs_etag_tracks_writes(client, api_headers):
+    first = client.get("/blogs", headers=api_headers)
+    etag = first.headers["etag"]
+    assert client.get("/blogs", headers={**api_headers, "If-None-Match": etag}).status_code == 304
+
+    client.post("/blogs", headers=api_headers, json={"naver_blog_id": "etag-blog"})
+    changed = client.get("/blogs", headers={**api_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()) == len(first.json()) + 1
+
+
+def test_refit_response_is_not_tagged_with_the_old_version(client, api_headers):
+    async def forget_curve() -> None:
+        async with async_session_scope() as session:
+            await session.execute(delete(CurveModel))
+        get_curve_cache()._curve = None
+
+    client.portal.call(forget_curve)
+    params = {"keywords": "etag-a"}
+    refit = client.get("/curve", headers=api_headers, params=params)
+    assert refit.status_code == 200
+    # The refit bumped the curve version while building, so its body carries no tag at all.
+    assert "etag" not in refit.headers
+
+    tagged = client.get("/curve", headers=api_headers, params=params)
+    assert tagged.json() == refit.json()
+    revalidated = client.get("/curve", headers={**api_headers, "If-None-Match": tagged.headers["etag"]}, params=params)
+    assert revalidated.status_code == 304
+
+
+def test_curve_body_follows_a_refit_made_by_another_worker(client, api_headers, monkeypatch):
+    params = {"keywords": "etag-b"}
+    before = client.get("/curve", headers=api_headers, params=params)
+    assert before.status_code == 200
+    monkeypatch.setattr(get_data_versions(), "check_interval", 0)
+
+    async def refit_elsewhere() -> str:
+        # Another worker's refit: a newer row and a version bump, none of this process's cache state.
+        async with async_session_scope() as session:
+            model = (await session.exec(select(CurveModel).order_by(CurveModel.updated_at.desc()))).first()
+            model.updated_at = datetime.utcnow() + timedelta(seconds=1)
+            session.add(model)
+            await DataVersions(check_interval=0).bump(session, CURVE)
+            return model.updated_at.isoformat()
+
+    updated_at = client.portal.call(refit_elsewhere)
+    after = client.get("/curve", headers={**api_headers, "If-None-Match": before.headers["etag"]}, params=params)
+    assert after.status_code == 200
+    assert after.json()["updated_at"] == updated_at
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from sqlmodel import select
+
+from app.db import async_read_scope
+from app.models import Post
+from app.services.importer import PostImporter
+
+
+def test_import_extracts_missing_keywords_in_spawned_workers(client, api_headers):
+    blog = client.post("/blogs", headers=api_headers, json={"naver_blog_id": "importer-test"}).json()
+    rows = [
+        {"url": "https://blog.naver.com/importer-test/1", "title": "수족구 전염 기간", "body": "수족구 전염 기간 수족구 전염 기간"},
+        {"url": "https://blog.naver.com/importer-test/2", "main_keyword": "아이 보습"},
+    ]
+
+    async def scenario():
+        importer = PostImporter(blog["id"], workers=1)
+        report = await importer.import_rows(rows)
+        async with async_read_scope() as session:
+            keywords = (await session.exec(select(Post.main_keyword).where(Post.blog_id == blog["id"]))).all()
+        return importer, report, sorted(keywords)
+
+    importer, report, keywords = client.portal.call(scenario)
+    assert report.inserted == 2 and report.extracted == 1
+    assert keywords == ["수족구 전염", "아이 보습"]
+    assert importer._pool is None
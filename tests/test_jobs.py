@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import select
+
+from app.db import async_read_scope, async_session_scope
+from app.models import Job, JobStatus, User
+from app.providers.web import TokenScan, TokenScanner
+from app.services.jobs import JOB_HANDLERS, RetryableJobError, get_job_queue
+from app.services.ranks import RankService
+from app.settings import get_settings
+
+
+def test_enqueue_rejects_incomplete_payload(client, api_headers):
+    response = client.post("/jobs", headers=api_headers, json={"kind": "verify_blog", "payload": {"blog_id": 1}})
+    assert response.status_code == 422
+    assert "post_url" in response.text
+
+    response = client.post("/jobs", headers=api_headers, json={"kind": "rank_refresh", "payload": {"blog": 1}})
+    assert response.status_code == 422
+
+
+def test_requeue_only_takes_jobs_with_an_expired_lease(client):
+    queue = get_job_queue()
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=queue.lease * 2)
+
+    async def scenario() -> tuple[int, JobStatus]:
+        async with async_session_scope() as session:
+            live = Job(kind="rank_refresh", dedupe_key="live", status=JobStatus.RUNNING, started_at=stale, heartbeat_at=now)
+            dead = Job(kind="rank_refresh", dedupe_key="dead", status=JobStatus.RUNNING, started_at=stale, heartbeat_at=stale)
+            session.add_all([live, dead])
+            await session.flush()
+            live_id = live.id
+        requeued = await queue.requeue_interrupted()
+        async with async_read_scope() as session:
+            return requeued, (await session.get(Job, live_id)).status
+
+    requeued, live_status = client.portal.call(scenario)
+    assert requeued == 1
+    assert live_status == JobStatus.RUNNING
+
+
+def test_probe_failures_are_retried(client, monkeypatch):
+    async def partly_failed(self, user_id):
+        return {"probed": 3, "found": 1, "not_found": 1, "failed": 1}
+
+    monkeypatch.setattr(RankService, "refresh_ranks", partly_failed)
+    with pytest.raises(RetryableJobError):
+        client.portal.call(JOB_HANDLERS["rank_refresh"], 1, {})
+
+
+def test_unreadable_post_is_retried_instead_of_failing_verification(client, api_headers, monkeypatch):
+    blog = client.post("/blogs", headers=api_headers, json={"naver_blog_id": "job-verify"}).json()
+
+    async def unreachable(self, url, tokens, client=None):
+        return TokenScan(url=url, error="ConnectError")
+
+    monkeypatch.setattr(get_settings(), "dev_allow_http_fetch", True)
+    monkeypatch.setattr(TokenScanner, "scan", unreachable)
+
+    async def scenario():
+        async with async_read_scope() as session:
+            user_id = (await session.exec(select(User.id).where(User.email == "tester@example.com"))).one()
+        payload = {"blog_id": blog["id"], "post_url": "https://blog.naver.com/job-verify/1"}
+        await JOB_HANDLERS["verify_blog"](user_id, payload)
+
+    with pytest.raises(RetryableJobError, match="ConnectError"):
+        client.portal.call(scenario)
+
+
+def test_worker_that_lost_its_lease_cannot_overwrite_the_new_claim(client):
+    queue = get_job_queue()
+
+    async def scenario() -> tuple[bool, bool, JobStatus]:
+        async with async_session_scope() as session:
+            job = Job(kind="rank_refresh", dedupe_key="reclaimed", status=JobStatus.RUNNING, attempts=2)
+            session.add(job)
+            await session.flush()
+            job_id = job.id
+        # The first worker still holds attempt 1; attempt 2 belongs to whoever reclaimed the job.
+        stale = Job(id=job_id, kind="rank_refresh", dedupe_key="reclaimed", attempts=1, max_attempts=3)
+        finished = await queue._finish(stale, JobStatus.SUCCEEDED, result_json="{}")
+        failed = await queue._fail(stale, "boom")
+        async with async_read_scope() as session:
+            return finished, failed, (await session.get(Job, job_id)).status
+
+    finished, failed, status = client.portal.call(scenario)
+    assert not finished and not failed
+    assert status == JobStatus.RUNNING
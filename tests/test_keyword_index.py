@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from sqlmodel import select
+
+from app.db import async_read_scope
+from app.models import User
+from app.services.importer import PostImporter
+from app.services.keyword_index import KeywordIndexes, get_keyword_indexes, normalize_token
+
+
+def test_particles_are_only_stripped_where_they_fit_the_stem():
+    assert normalize_token("아토피가") == "아토피"
+    assert normalize_token("병원이") == "병원"
+    assert normalize_token("아토피에서는") == "아토피"
+    assert normalize_token("서울로") == "서울"
+    assert normalize_token("전문가") == "전문가"
+    assert normalize_token("전문가는") == "전문가"
+    assert normalize_token("평가") == "평가"
+    assert normalize_token("어린이") == "어린이"
+
+
+def test_past_drafts_are_counted_after_a_restart(client, api_headers):
+    drafts = [
+        "수족구 초기 증상과 수족구 전염 기간. 수족구 전염 기간에는 등원을 쉬는 것이 좋습니다.",
+        "수족구 전염 기간 동안 손 씻기가 중요합니다. 수족구 전염 기간은 보통 일주일입니다.",
+    ]
+    probe = "수족구 전염 기간과 열 관리. 수족구 전염 기간에 열이 나면 해열제를 씁니다."
+
+    async def scenario():
+        async with async_read_scope() as session:
+            user_id = (await session.exec(select(User.id).where(User.email == "tester@example.com"))).one()
+        running = KeywordIndexes()
+        for draft in drafts:
+            await running.extract(user_id, draft)
+        # A fresh process only has the database to go on.
+        restarted = await KeywordIndexes().for_user(user_id)
+        return await running.for_user(user_id), restarted
+
+    running, restarted = client.portal.call(scenario)
+    assert restarted.documents == running.documents
+    assert restarted.document_frequency == running.document_frequency
+    assert restarted.rank(probe) == running.rank(probe)
+
+
+def test_every_post_is_its_own_document(client, api_headers):
+    blog = client.post("/blogs", headers=api_headers, json={"naver_blog_id": "keyword-posts"}).json()
+    keywords = ["성인 여드름", "성인 여드름", "여드름 흉터", "여드름 흉터", "여드름 압출"]
+    rows = [{"url": f"https://blog.naver.com/keyword-posts/{i}", "main_keyword": kw} for i, kw in enumerate(keywords)]
+
+    async def scenario():
+        async with async_read_scope() as session:
+            user_id = (await session.exec(select(User.id).where(User.email == "tester@example.com"))).one()
+        # The importer feeds the process-wide indexes.
+        before = await get_keyword_indexes().for_user(user_id)
+        documents, acne = before.documents, before.document_frequency["여드름"]
+        await PostImporter(blog["id"]).import_rows(rows)
+        restarted = await KeywordIndexes().for_user(user_id)
+        return documents, acne, before, restarted
+
+    documents, acne, running, restarted = client.portal.call(scenario)
+    for index in (running, restarted):
+        assert index.documents == documents + 5
+        assert index.document_frequency["여드름"] == acne + 5
+        assert index.document_frequency[("성인", "여드름")] >= 2
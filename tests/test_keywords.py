@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+
+def _keywords(client, headers, draft: str) -> list[str]:
+    response = client.post("/keywords/extract", headers=headers, json={"draft": draft})
+    assert response.status_code == 200
+    return [candidate["keyword"] for candidate in response.json()["candidates"]]
+
+
+def test_candidates_follow_the_draft(client, api_headers):
+    acne = _keywords(client, api_headers, "여드름 흉터 레이저 치료 후기. 여드름 흉터에는 레이저 시술 횟수가 중요합니다.")
+    atopy = _keywords(client, api_headers, "환절기 아토피 관리법. 아토피 피부는 보습과 실내 습도 조절이 중요합니다.")
+    assert acne and atopy
+    assert acne != atopy
+    assert "여드름" in acne
+    assert "아토피" in atopy
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+
+from app.providers.web import PageFetcher, TokenScanner
+
+_EUC_KR_PAGE = (
+    '<html><head><meta charset="euc-kr"><title>환절기 아토피</title></head>'
+    "<body><h2>보습 루틴</h2><p>목욕 직후 보습제를 바릅니다.</p></body></html>"
+).encode("euc-kr")
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "euckr.example.com":
+        return httpx.Response(200, content=_EUC_KR_PAGE, headers={"Content-Type": "text/html"})
+    if request.url.host == "bogus.example.com":
+        return httpx.Response(200, content=b"<title>x</title>", headers={"Content-Type": "text/html; charset=x-bogus"})
+    if request.url.host == "broken.example.com":
+        return httpx.Response(200, content=b"<title>x</title><![bogus[ x ]]>", headers={"Content-Type": "text/html"})
+    return httpx.Response(200, content="<title>정상</title><h2>본문</h2>".encode(), headers={"Content-Type": "text/html"})
+
+
+def _fetch(urls: list[str]):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(_handler)) as client:
+            return await PageFetcher().fetch_many(urls, client)
+
+    return asyncio.run(run())
+
+
+def test_meta_charset_decides_the_decoding():
+    (page,) = _fetch(["https://euckr.example.com/post/1"])
+    assert page.error is None
+    assert page.title == "환절기 아토피"
+    assert page.headings == [(2, "보습 루틴")]
+
+
+def test_undecodable_pages_are_unreachable_without_failing_the_batch():
+    bogus, broken, fine = _fetch(
+        ["https://bogus.example.com/1", "https://broken.example.com/1", "https://fine.example.com/1"]
+    )
+    assert bogus.error == "LookupError"
+    assert broken.error == "AssertionError"
+    assert fine.error is None and fine.title == "정상"
+
+
+class _Chunks(httpx.AsyncByteStream):
+    """Response body served in fixed pieces, counting how many were pulled."""
+
+    def __init__(self, chunks) -> None:
+        self.chunks = chunks
+        self.served = 0
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            self.served += 1
+            yield chunk
+
+
+def _scan(url: str, tokens: list[str], routes: dict[str, httpx.AsyncByteStream], max_bytes: int = 1024 * 1024):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=routes[str(request.url)], headers={"Content-Type": "text/html"})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await TokenScanner(max_bytes=max_bytes).scan(url, tokens, client)
+
+    return asyncio.run(run())
+
+
+def test_token_split_across_chunks_is_found_and_reading_stops():
+    body = _Chunks([b"<title>ab TITLE-", b"TOKEN</title><p>BODY-TO", b"KEN</p>", b"x" * 4096, b"x" * 4096])
+    scan = _scan("https://post.example.com/1", ["TITLE-TOKEN", "BODY-TOKEN"], {"https://post.example.com/1": body})
+    assert scan.found == {"TITLE-TOKEN", "BODY-TOKEN"}
+    assert body.served == 3
+    assert not scan.truncated
+
+
+def test_main_frame_is_followed_for_the_post_body():
+    routes = {
+        "https://blog.example.com/tester/1": _Chunks(
+            [b'<html><iframe id="mainFrame" src="/PostView?blogId=tester&amp;logNo=1"></iframe>TITLE-TOKEN</html>']
+        ),
+        "https://blog.example.com/PostView?blogId=tester&logNo=1": _Chunks([b"<div>BODY-TOKEN</div>"]),
+    }
+    scan = _scan("https://blog.example.com/tester/1", ["TITLE-TOKEN", "BODY-TOKEN"], routes)
+    assert scan.url == "https://blog.example.com/PostView?blogId=tester&logNo=1"
+    assert scan.found == {"TITLE-TOKEN", "BODY-TOKEN"}
+
+
+def test_scan_stops_at_the_byte_cap():
+    body = _Chunks(b"x" * 100 for _ in range(1000))
+    scan = _scan("https://big.example.com/1", ["TITLE-TOKEN"], {"https://big.example.com/1": body}, max_bytes=1050)
+    assert scan.truncated
+    assert scan.bytes_read == 1050
+    assert scan.found == set()
+    assert body.served == 11
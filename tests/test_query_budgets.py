@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from sqlmodel import delete
+
+from app.db import async_session_scope
+from app.models import CurveModel
+from app.services.curve import get_curve_cache
+
+
+def test_curve_refit_stays_within_budget(client):
+    # Cold path under QUERY_DEBUG_MODE=raise: no fitted curve, unseen keywords, fresh ranks,
+    # and the keyless development user, whose lookup is not cached.
+    async def forget_curve() -> None:
+        async with async_session_scope() as session:
+            await session.execute(delete(CurveModel))
+        get_curve_cache()._curve = None
+
+    client.portal.call(forget_curve)
+    assert client.post("/ranks/refresh").status_code == 200
+    response = client.get("/curve", params={"keywords": "cold-a,cold-b,cold-c"})
+    assert response.status_code == 200, response.text
+    assert set(response.json()["predict"]) == {"cold-a", "cold-b", "cold-c"}
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.providers.naver import NOT_FOUND_RANK, SEARCH_PAGE_SIZE, NaverSearchProvider
+from app.services.ranks import ProbeTarget, RankProbe
+from app.settings import get_settings
+
+_TARGET = "https://blog.naver.com/tester/250"
+
+
+@pytest.fixture(autouse=True)
+def naver_keys(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "naver_search_client_id", "id")
+    monkeypatch.setattr(settings, "naver_search_client_secret", "secret")
+
+
+def _page(start: int, rank_of_target: int | None = None) -> httpx.Response:
+    links = [f"https://blog.naver.com/other/{start + offset}" for offset in range(SEARCH_PAGE_SIZE)]
+    if rank_of_target is not None and start <= rank_of_target < start + SEARCH_PAGE_SIZE:
+        links[rank_of_target - start] = "https://m.blog.naver.com/tester/250/"
+    return httpx.Response(200, json={"items": [{"link": link} for link in links]})
+
+
+def _run(handler, coro_factory):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await coro_factory(RankProbe(NaverSearchProvider(), client, page_concurrency=3))
+
+    return asyncio.run(run())
+
+
+def test_probe_stops_paging_once_the_post_is_found():
+    starts: list[int] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        start = int(request.url.params["start"])
+        starts.append(start)
+        return _page(start, rank_of_target=250)
+
+    assert _run(handler, lambda probe: probe.probe("아토피", _TARGET)) == 250
+    # Pages 1-3 are in the window; at most two more were started before page 3 matched.
+    assert {1, 101, 201} <= set(starts)
+    assert max(starts) <= 401
+
+
+def test_probe_reports_not_found_after_the_last_page():
+    starts: list[int] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        start = int(request.url.params["start"])
+        starts.append(start)
+        return _page(start)
+
+    assert _run(handler, lambda probe: probe.probe("아토피", _TARGET)) == NOT_FOUND_RANK
+    assert sorted(starts) == list(range(1, 1000, SEARCH_PAGE_SIZE))
+
+
+def test_probe_many_counts_failed_probes_and_keeps_the_rest():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.params["query"] == "broken":
+            return httpx.Response(500)
+        return _page(int(request.url.params["start"]), rank_of_target=42)
+
+    targets = [
+        ProbeTarget(post_id=1, keyword="아토피", url=_TARGET),
+        ProbeTarget(post_id=2, keyword="broken", url=_TARGET),
+        ProbeTarget(post_id=3, keyword="보습", url=_TARGET),
+    ]
+    results, failed = _run(handler, lambda probe: probe.probe_many(targets))
+    assert failed == 1
+    assert [(result.post_id, result.rank) for result in results] == [(1, 42), (3, 42)]